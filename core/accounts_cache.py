@@ -0,0 +1,96 @@
+"""Cache por usuário da listagem de contas (GET /auth/instagram/accounts).
+
+O frontend consultava o Firestore direto a cada page load. A listagem agora
+sai do backend e, por processo, guarda o corpo JSON já serializado + ETag
+forte (hash do corpo), indexado por `user_uid`.
+
+Validade: a entrada é do `update_time` do doc raiz `integrations/{uid}`, então
+1 leitura do doc raiz confirma o cache, inclusive quando outra instância
+alterou as contas. Por isso TODA escrita em conta precisa tocar a raiz: o
+merge do callback (`upsert_account`) e as desativações (deauth/disconnect)
+gravam a raiz junto; scripts que escrevem só nos subdocs (refresh_profiles,
+backfill) chamam `accounts_store.touch_roots` depois do flush. Quem altera no
+próprio processo chama `invalidate()` para liberar a entrada na hora.
+
+LRU limitado (`ACCOUNTS_CACHE_MAX_ENTRIES`, default 10000). Thread-safe: o
+worker de deauth invalida de uma thread.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+
+@dataclass(frozen=True)
+class CachedAccounts:
+    version: object  # update_time do doc raiz
+    body: bytes
+    etag: str
+
+
+def etag_for(body: bytes) -> str:
+    """ETag forte: muda se e somente se o corpo muda."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (lista de ETags ou `*`). Comparação fraca, como pede a RFC 9110."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class AccountsCache:
+    def __init__(self, max_entries: int = 10_000):
+        self._entries: OrderedDict[str, CachedAccounts] = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_uid: str, version) -> Optional[CachedAccounts]:
+        """Entrada do usuário se ainda é da mesma versão do doc raiz."""
+        with self._lock:
+            entry = self._entries.get(user_uid)
+            if entry is None or version is None or entry.version != version:
+                return None
+            self._entries.move_to_end(user_uid)
+            return entry
+
+    def put(self, user_uid: str, version, body: bytes) -> CachedAccounts:
+        entry = CachedAccounts(version=version, body=body, etag=etag_for(body))
+        if version is None:
+            return entry
+        with self._lock:
+            self._entries[user_uid] = entry
+            self._entries.move_to_end(user_uid)
+            if len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_uids: Iterable[str] | str) -> None:
+        if isinstance(user_uids, str):
+            user_uids = (user_uids,)
+        with self._lock:
+            for user_uid in user_uids:
+                self._entries.pop(user_uid, None)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+accounts_cache = AccountsCache(_env_int("ACCOUNTS_CACHE_MAX_ENTRIES", 10_000))
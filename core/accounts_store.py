@@ -0,0 +1,259 @@
+"""Armazenamento das contas Instagram de uma integração.
+
+Dois layouts convivem em `integrations/{uid}` (campo `accounts_layout`):
+
+- `array` (legado): todas as contas no array `instagram_accounts` do doc raiz.
+  Cada conexão reescreve o array inteiro; agências com centenas de contas
+  chegam perto do limite de 1 MiB por documento.
+- `subcollection`: um doc por conta em `integrations/{uid}/instagram_accounts/{id}`.
+  Upsert é O(1) e a listagem pagina. O doc raiz guarda só campos-resumo para
+  leitores legados: `api_key` (última conta conectada), `status`,
+  `token_expires_in_seconds`, `account_count`, `account_ids`, `last_account`.
+
+Docs sem `accounts_layout` são `array`. Integrações NOVAS usam
+`INSTAGRAM_ACCOUNTS_LAYOUT` (default `array`): o frontend ainda lê
+`instagram_accounts` direto do doc raiz (CONTRATO_INTEGRACAO.md), então
+`subcollection` é opt-in até os leitores passarem a usar
+GET /auth/instagram/accounts. As existentes migram via
+`scripts/migrate_accounts_to_subcollection.py`.
+
+As RPCs usam o orçamento da request corrente (`core.deadline`), quando há um.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Optional
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from core.deadline import rpc_timeout
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_SUBCOLLECTION = "instagram_accounts"
+LAYOUT_ARRAY = "array"
+LAYOUT_SUBCOLLECTION = "subcollection"
+
+NEW_INTEGRATION_LAYOUT = (
+    os.getenv("INSTAGRAM_ACCOUNTS_LAYOUT", LAYOUT_ARRAY).strip().lower()
+    or LAYOUT_ARRAY
+)
+
+
+def layout_of(data: Optional[dict]) -> str:
+    """Layout de um doc de integração existente (None = doc ainda não existe)."""
+    if data is None:
+        return NEW_INTEGRATION_LAYOUT
+    return data.get("accounts_layout") or LAYOUT_ARRAY
+
+
+def accounts_collection(integration_ref):
+    return integration_ref.collection(ACCOUNTS_SUBCOLLECTION)
+
+
+def load_accounts(
+    integration_ref,
+    data: dict,
+    *,
+    limit: Optional[int] = None,
+    start_after: Optional[str] = None,
+) -> list[dict]:
+    """Contas da integração, em qualquer layout.
+
+    Com `limit`/`start_after` (ID da última conta da página anterior) pagina;
+    sem eles retorna todas.
+    """
+    if layout_of(data) != LAYOUT_SUBCOLLECTION:
+        accounts = list(data.get("instagram_accounts") or [])
+        if start_after is not None:
+            ids = [str(a.get("id")) for a in accounts]
+            accounts = accounts[ids.index(start_after) + 1:] if start_after in ids else []
+        return accounts[:limit] if limit is not None else accounts
+
+    query = accounts_collection(integration_ref).order_by(FieldPath.document_id())
+    if start_after is not None:
+        query = query.start_after({FieldPath.document_id(): start_after})
+    if limit is not None:
+        query = query.limit(limit)
+    return [snap.to_dict() or {} for snap in query.stream(timeout=rpc_timeout("firestore"))]
+
+
+def has_account(integration_ref, data: dict, account_id: str) -> bool:
+    """True se a conta já está na integração (O(1) no layout subcollection)."""
+    if layout_of(data) != LAYOUT_SUBCOLLECTION:
+        return any(str(a.get("id")) == account_id for a in (data.get("instagram_accounts") or []))
+    return accounts_collection(integration_ref).document(account_id).get(
+        timeout=rpc_timeout("firestore"),
+    ).exists
+
+
+def touch_roots(bulk_writer, integration_refs) -> int:
+    """Regrava `updated_at` das raízes cujas contas (subdocs) foram alteradas.
+
+    O cache da listagem (core.accounts_cache) valida pelo `update_time` da
+    raiz: quem escreve só nos subdocs chama isto DEPOIS do flush das escritas
+    de conta — o novo `update_time` da raiz é posterior a elas.
+    """
+    count = 0
+    for ref in integration_refs:
+        bulk_writer.update(ref, {"updated_at": firestore.SERVER_TIMESTAMP})
+        count += 1
+    return count
+
+
+def _last_account(account_doc: dict) -> dict:
+    return {"id": account_doc["id"], "username": account_doc.get("username") or ""}
+
+
+def upsert_account(db, integration_ref, account_doc: dict, root_fields: dict) -> int:
+    """Adiciona/substitui `account_doc` (pelo `id`) e grava `root_fields` no doc raiz.
+
+    Uma transação relê a raiz e decide o layout pelo estado ATUAL do doc — o
+    snapshot do caller é de antes das chamadas à Meta, e a migração ou outro
+    worker pode ter mudado o doc nesse meio tempo. Doc inexistente é criado no
+    layout `NEW_INTEGRATION_LAYOUT` (`root_fields` deve trazer os campos de
+    criação; se outra conexão já criou a raiz, `created_at` é preservado).
+    Retorna o total de contas após o upsert.
+    """
+    account_id = str(account_doc["id"])
+    account_ref = accounts_collection(integration_ref).document(account_id)
+
+    @firestore.transactional
+    def _run(transaction) -> int:
+        root_snap = integration_ref.get(transaction=transaction, timeout=rpc_timeout("firestore"))
+        data = root_snap.to_dict() if root_snap.exists else None
+        if layout_of(data) == LAYOUT_SUBCOLLECTION:
+            return _upsert_subcollection(transaction, integration_ref, account_ref, data, account_doc, root_fields)
+        return _upsert_array(transaction, integration_ref, data, account_doc, root_fields)
+
+    return _run(db.transaction())
+
+
+def _update_fields(root_fields: dict) -> dict:
+    # Raiz criada por outra conexão entre a leitura do caller e a transação:
+    # `created_at` já está lá.
+    return {k: v for k, v in root_fields.items() if k != "created_at"}
+
+
+def _upsert_array(transaction, integration_ref, data: Optional[dict], account_doc: dict, root_fields: dict) -> int:
+    account_id = str(account_doc["id"])
+    existing_accounts = (data or {}).get("instagram_accounts") or []
+    # Substitui se já existe (refresh de token), senão append.
+    merged = [a for a in existing_accounts if str(a.get("id")) != account_id]
+    merged.append(account_doc)
+    summary = {
+        "instagram_accounts": merged,
+        "account_ids": [str(a.get("id")) for a in merged],
+        "account_count": len(merged),
+        "last_account": _last_account(account_doc),
+    }
+    if data is None:
+        transaction.set(integration_ref, {**root_fields, **summary})
+    else:
+        transaction.update(integration_ref, {**_update_fields(root_fields), **summary})
+    return len(merged)
+
+
+def _upsert_subcollection(
+    transaction, integration_ref, account_ref, data: Optional[dict], account_doc: dict, root_fields: dict,
+) -> int:
+    """Existência da conta e resumo da raiz lidos e gravados na mesma
+    transação — duas conexões simultâneas da mesma conta não contam em dobro."""
+    account_id = str(account_doc["id"])
+    # Leitura antes de qualquer escrita (regra da transação).
+    account_snap = account_ref.get(transaction=transaction, timeout=rpc_timeout("firestore"))
+    transaction.set(account_ref, account_doc)
+    if data is None:
+        transaction.set(integration_ref, {
+            **root_fields,
+            "accounts_layout": LAYOUT_SUBCOLLECTION,
+            "account_ids": [account_id],
+            "account_count": 1,
+            "last_account": _last_account(account_doc),
+        })
+        return 1
+
+    account_ids = [str(i) for i in (data.get("account_ids") or [])]
+    total = int(data.get("account_count") or len(account_ids))
+    if not account_snap.exists:
+        total += 1
+    if account_id not in account_ids:
+        account_ids.append(account_id)
+    transaction.update(integration_ref, {
+        **_update_fields(root_fields),
+        "account_ids": account_ids,
+        "account_count": total,
+        "last_account": _last_account(account_doc),
+    })
+    return total
+
+
+# Escritas por transação do Firestore: 500, menos a do doc raiz.
+_MAX_TX_DELETES = 499
+
+
+def remove_accounts(db, integration_ref, account_ids: Optional[set[str]]) -> list[dict]:
+    """Remove contas da integração (transação) e recalcula os campos-resumo.
+
+    `account_ids` None remove todas. Retorna os docs das contas removidas
+    (com `api_key`, para revogar os secrets). O doc raiz fica: sem contas
+    ativas vira `status=inactive`; `api_key` da raiz passa para a última
+    conta restante. No layout subcollection, mais de `_MAX_TX_DELETES`
+    contas são removidas em várias transações.
+    """
+    removed: list[dict] = []
+    while True:
+        batch_removed = _remove_accounts_tx(db, integration_ref, account_ids)
+        removed.extend(batch_removed)
+        if len(batch_removed) < _MAX_TX_DELETES:
+            return removed
+
+
+def _remove_accounts_tx(db, integration_ref, account_ids: Optional[set[str]]) -> list[dict]:
+
+    @firestore.transactional
+    def _run(transaction) -> list[dict]:
+        snap = integration_ref.get(transaction=transaction)
+        if not snap.exists:
+            return []
+        data = snap.to_dict() or {}
+
+        if layout_of(data) == LAYOUT_SUBCOLLECTION:
+            # Materializa antes de escrever: transação não permite leitura após escrita.
+            account_snaps = list(accounts_collection(integration_ref).stream(transaction=transaction))
+            removed, kept = [], []
+            for account_snap in account_snaps:
+                account = account_snap.to_dict() or {}
+                if (account_ids is None or account_snap.id in account_ids) and len(removed) < _MAX_TX_DELETES:
+                    transaction.delete(account_snap.reference)
+                    removed.append({**account, "id": account_snap.id})
+                else:
+                    kept.append({**account, "id": account_snap.id})
+            root_updates: dict = {}
+        else:
+            removed, kept = [], []
+            for account in data.get("instagram_accounts") or []:
+                selected = account_ids is None or str(account.get("id")) in account_ids
+                (removed if selected else kept).append(account)
+            root_updates = {"instagram_accounts": kept}
+
+        if not removed:
+            return []
+        root_updates.update({
+            "account_ids": [str(a.get("id")) for a in kept],
+            "account_count": len(kept),
+            "last_account": _last_account(kept[-1]) if kept else firestore.DELETE_FIELD,
+            "updated_at": firestore.SERVER_TIMESTAMP,
+        })
+        removed_keys = {a.get("api_key") for a in removed}
+        if data.get("api_key") in removed_keys:
+            root_updates["api_key"] = (kept[-1].get("api_key") if kept else None) or firestore.DELETE_FIELD
+        if not any(a.get("active", True) for a in kept):
+            root_updates["status"] = "inactive"
+        transaction.update(integration_ref, root_updates)
+        return removed
+
+    return _run(db.transaction())
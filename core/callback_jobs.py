@@ -0,0 +1,170 @@
+"""Jobs do modo assíncrono do process-callback.
+
+No modo async o endpoint valida o state, troca o code (o code expira rápido,
+então isso continua no request) e responde 202 com um `job_id`. O resto
+(short→long, /me, secret, merge no Firestore) roda numa task de fundo e o
+resultado fica em `oauth_callback_jobs/{job_id}`:
+
+    {user_uid, status: pending|success|error, result?, error?, status_code?,
+     created_at, expires_at}
+
+O doc no Firestore permite consultar o status de qualquer worker/instância;
+long-poll no mesmo processo acorda por evento local, nos demais consulta o
+doc periodicamente. `expires_at` serve para a política de TTL do Firestore.
+
+Job que não termina não fica `pending` para sempre: o `drain` do shutdown
+marca como `error` os que não acabaram no prazo, e `get` reporta como expirado
+(504) um pending mais velho que `CALLBACK_JOB_DEADLINE_S` + folga (instância
+morta sem shutdown limpo).
+
+Obs.: no Cloud Run a task de fundo precisa de CPU fora do request
+(`--no-cpu-throttling`, já no cloudbuild.yaml).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as _dt
+import logging
+import uuid
+from typing import Awaitable, Optional
+
+from google.cloud import firestore
+
+from core import deadline
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "oauth_callback_jobs"
+JOB_TTL = _dt.timedelta(days=1)
+
+STATUS_PENDING = "pending"
+STATUS_SUCCESS = "success"
+STATUS_ERROR = "error"
+
+_POLL_INTERVAL_S = 1.0
+# Folga além do orçamento do job antes de tratar um pending como abandonado.
+_EXPIRY_GRACE_S = 30.0
+
+_INTERRUPTED_ERROR = "Processamento interrompido. Tente conectar novamente."
+
+
+class CallbackJobs:
+    def __init__(self):
+        self._events: dict[str, asyncio.Event] = {}
+        # task → (db, job_id): o drain precisa saber qual job marcar.
+        self._tasks: dict[asyncio.Task, tuple] = {}
+
+    def __len__(self) -> int:
+        """Jobs em andamento neste processo."""
+        return len(self._tasks)
+
+    @staticmethod
+    def _ref(db, job_id: str):
+        return db.collection(JOBS_COLLECTION).document(job_id)
+
+    def create(self, db, user_uid: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = _dt.datetime.now(_dt.timezone.utc)
+        self._ref(db, job_id).set({
+            "user_uid": user_uid,
+            "status": STATUS_PENDING,
+            "created_at": firestore.SERVER_TIMESTAMP,
+            "expires_at": now + JOB_TTL,
+        })
+        self._events[job_id] = asyncio.Event()
+        return job_id
+
+    def spawn(self, db, job_id: str, work: Awaitable[dict]) -> None:
+        """Roda `work` (retorna o response serializável) e grava o desfecho no job."""
+
+        async def _run() -> None:
+            try:
+                result = await work
+                update = {"status": STATUS_SUCCESS, "result": result}
+            except Exception as e:
+                status_code = getattr(e, "status_code", 500)
+                detail = getattr(e, "detail", None) or "Erro ao processar integração"
+                if status_code == 500:
+                    logger.error("Job de callback %s falhou: %s", job_id, e, exc_info=True)
+                update = {"status": STATUS_ERROR, "status_code": status_code, "error": detail}
+            update["finished_at"] = firestore.SERVER_TIMESTAMP
+            try:
+                await asyncio.to_thread(self._ref(db, job_id).update, update)
+            except Exception as e:
+                logger.error("Falha gravando desfecho do job %s: %s", job_id, e)
+            event = self._events.pop(job_id, None)
+            if event is not None:
+                event.set()
+
+        task = asyncio.create_task(_run())
+        self._tasks[task] = (db, job_id)
+        task.add_done_callback(lambda t: self._tasks.pop(t, None))
+
+    @staticmethod
+    def _expired(data: dict) -> bool:
+        created_at = data.get("created_at")
+        if not isinstance(created_at, _dt.datetime):
+            return False
+        age = (_dt.datetime.now(_dt.timezone.utc) - created_at).total_seconds()
+        return age > deadline.CALLBACK_JOB_DEADLINE_S + _EXPIRY_GRACE_S
+
+    async def get(self, db, job_id: str, *, wait_s: float = 0.0) -> Optional[dict]:
+        """Lê o job; com `wait_s` > 0 espera (long-poll) até sair de pending."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, wait_s)
+        while True:
+            snap = await asyncio.to_thread(self._ref(db, job_id).get)
+            if not snap.exists:
+                return None
+            data = snap.to_dict() or {}
+            if data.get("status") == STATUS_PENDING and self._expired(data):
+                return {**data, "status": STATUS_ERROR, "status_code": 504, "error": _INTERRUPTED_ERROR}
+            remaining = deadline - loop.time()
+            if data.get("status") != STATUS_PENDING or remaining <= 0:
+                return data
+            event = self._events.get(job_id)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), remaining)
+                else:
+                    await asyncio.sleep(min(_POLL_INTERVAL_S, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+    async def drain(self, timeout_s: float = 20.0) -> None:
+        """Shutdown: espera as tasks em andamento terminarem (até `timeout_s`).
+
+        As que não terminam são canceladas e o job vai para `error` — o
+        cliente recebe o desfecho em vez de um pending eterno.
+        """
+        if not self._tasks:
+            return
+        jobs = dict(self._tasks)
+        _, pending = await asyncio.wait(set(jobs), timeout=timeout_s)
+        if not pending:
+            return
+        logger.error("%d jobs de callback interrompidos no shutdown", len(pending))
+        for task in pending:
+            task.cancel()
+        update = {
+            "status": STATUS_ERROR,
+            "status_code": 503,
+            "error": _INTERRUPTED_ERROR,
+            "finished_at": firestore.SERVER_TIMESTAMP,
+        }
+
+        def _mark(db, job_id: str) -> None:
+            try:
+                self._ref(db, job_id).update(update)
+            except Exception as e:
+                logger.error("Falha marcando job %s como interrompido: %s", job_id, e)
+
+        await asyncio.gather(*(asyncio.to_thread(_mark, *jobs[task]) for task in pending))
+        for task in pending:
+            event = self._events.pop(jobs[task][1], None)
+            if event is not None:
+                event.set()
+
+
+callback_jobs = CallbackJobs()
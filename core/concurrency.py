@@ -0,0 +1,204 @@
+"""Limite de concorrência adaptativo (AIMD) para as chamadas à Meta.
+
+Numa lentidão da Meta cada callback segura coroutine + conexão por até
+3 tentativas de 30s por etapa; sem limite a instância acumula milhares de
+requests esperando e estoura memória/sockets. `AdaptiveLimiter`:
+
+- no máximo `limit` chamadas em voo; o excedente espera numa fila limitada
+  (`max_queue`), cada uma por até `queue_timeout_s`;
+- fila cheia ou espera estourada → `OverloadedError` (main.py responde 503 +
+  Retry-After) — melhor rejeitar cedo que aceitar e responder em 90s;
+- AIMD: chamada rápida e bem-sucedida sobe o limite em +1 por "janela"
+  (+1/limit por chamada); timeout/erro de transporte/5xx/429 ou latência acima
+  de `latency_target_s` multiplica por `backoff` (no máx. 1x por janela de
+  latência, p/ uma rajada de timeouts não zerar o limite). Chamada cortada
+  pelo deadline da request (`discard_sample`) não conta.
+
+Uso no event loop (sem locks); estado por processo.
+
+Envs:
+- META_CONCURRENCY_INITIAL / _MIN / _MAX: limite inicial e faixa (20 / 4 / 200).
+- META_QUEUE_MAX: requests esperando vaga (default 200).
+- META_QUEUE_TIMEOUT_S: espera máxima na fila (default 5).
+- META_LATENCY_TARGET_S: latência acima da qual o limite cai (default 3).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import logging
+import math
+import os
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Sem vaga para chamar a Meta agora. `retry_after` em segundos (>= 1)."""
+
+    status_code = 503
+    detail = "Serviço sobrecarregado. Tente novamente em instantes."
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"limite de concorrência saturado (retry_after={retry_after}s)")
+        self.retry_after = retry_after
+
+
+class _Slot:
+    def __init__(self):
+        self.overloaded = False
+        self.discarded = False
+
+    def mark_overloaded(self) -> None:
+        """Resposta indica sobrecarga do lado da Meta (5xx/429)."""
+        self.overloaded = True
+
+    def discard_sample(self) -> None:
+        """Chamada cortada pelo deadline da request: a latência diz mais do
+        orçamento do cliente que da Meta — não entra no AIMD."""
+        self.discarded = True
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        *,
+        initial: float = 20,
+        min_limit: float = 4,
+        max_limit: float = 200,
+        max_queue: int = 200,
+        queue_timeout_s: float = 5.0,
+        latency_target_s: float = 3.0,
+        backoff: float = 0.7,
+    ):
+        self.limit = float(initial)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.latency_target_s = latency_target_s
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: collections.deque[asyncio.Future] = collections.deque()
+        self._latency_ewma = 0.5
+        self._last_decrease = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def saturated(self) -> bool:
+        """Fila cheia: quem chegar agora seria rejeitado — dá pra recusar antes de começar."""
+        return self.in_flight >= int(self.limit) and len(self._waiters) >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Estimativa de quando a fila atual escoa (1..30s)."""
+        backlog = (len(self._waiters) + 1) / max(1.0, self.limit)
+        return max(1, min(30, math.ceil(self._latency_ewma * backlog)))
+
+    async def _acquire(self, max_wait_s: Optional[float] = None) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise self.reject("fila cheia")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            timeout = self.queue_timeout_s if max_wait_s is None else min(self.queue_timeout_s, max_wait_s)
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return  # vaga chegou junto com o timeout: fica com ela
+            waiter.cancel()
+            raise self.reject("timeout na fila")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()  # vaga repassada a quem desistiu: devolve
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            with contextlib.suppress(ValueError):
+                self._waiters.remove(waiter)
+
+    def reject(self, reason: str) -> OverloadedError:
+        """Loga a rejeição e devolve o OverloadedError (quem chama lança)."""
+        retry_after = self.retry_after()
+        logger.warning(
+            "Meta: rejeitando (%s) in_flight=%d limit=%.1f fila=%d", reason,
+            self.in_flight, self.limit, len(self._waiters),
+            extra={
+                "event": "concurrency.shed", "reason": reason, "limit": round(self.limit, 1),
+                "in_flight": self.in_flight, "queued": len(self._waiters),
+            },
+        )
+        return OverloadedError(retry_after)
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        # Repassa vagas livres a quem espera (o waiter herda o in_flight).
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _on_sample(self, latency_s: float, dropped: bool) -> None:
+        self._latency_ewma += 0.2 * (latency_s - self._latency_ewma)
+        now = time.monotonic()
+        if dropped or latency_s > self.latency_target_s:
+            if now - self._last_decrease >= self._latency_ewma:
+                self._last_decrease = now
+                previous = self.limit
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                logger.warning(
+                    "Meta: limite de concorrência %.1f → %.1f (latência=%.2fs, erro=%s)",
+                    previous, self.limit, latency_s, dropped,
+                    extra={"event": "concurrency.decrease", "limit": round(self.limit, 1)},
+                )
+        else:
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, max_wait_s: Optional[float] = None) -> AsyncIterator[_Slot]:
+        """Ocupa uma vaga durante uma chamada. Pode lançar OverloadedError.
+
+        `max_wait_s` encurta a espera na fila (ex.: orçamento restante da request).
+        """
+        await self._acquire(max_wait_s)
+        slot = _Slot()
+        started = time.monotonic()
+        dropped = False
+        try:
+            yield slot
+        except (httpx.TimeoutException, httpx.TransportError):
+            dropped = True
+            raise
+        finally:
+            if not slot.discarded:
+                self._on_sample(time.monotonic() - started, dropped or slot.overloaded)
+            self._release_slot()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+meta_limiter = AdaptiveLimiter(
+    initial=_env_float("META_CONCURRENCY_INITIAL", 20),
+    min_limit=_env_float("META_CONCURRENCY_MIN", 4),
+    max_limit=_env_float("META_CONCURRENCY_MAX", 200),
+    max_queue=int(_env_float("META_QUEUE_MAX", 200)),
+    queue_timeout_s=_env_float("META_QUEUE_TIMEOUT_S", 5.0),
+    latency_target_s=_env_float("META_LATENCY_TARGET_S", 3.0),
+)
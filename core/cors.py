@@ -0,0 +1,118 @@
+"""CORS: origens exatas + padrões com curinga, e cache longo do preflight.
+
+`ALLOWED_CORS_ORIGINS` (CSV) aceita:
+- origem exata: `https://app.proof.social`;
+- padrão com `*` num rótulo do host ou na porta:
+  `https://*.preview.proof.social`, `http://localhost:*`.
+
+Compilado uma vez no import do `main`: exatas num frozenset (O(1)) e os
+padrões numa única regex (alternação, `fullmatch`). `*` casa exatamente UM
+rótulo DNS (`[a-z0-9-]`), nunca `.` — `https://*.proof.social` não aceita
+`https://a.b.proof.social` nem `https://x.proof.social.evil.com`. `*`
+sozinho (qualquer origem) é recusado: a API não abre CORS geral.
+
+Preflight: `CORS_MAX_AGE` (default 86400s) vai em `Access-Control-Max-Age`;
+o navegador reaproveita o OPTIONS por esse tempo (Chrome limita a 7200s,
+Firefox a 86400s) em vez de repetir um RTT antes de cada POST.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from typing import Optional
+
+from starlette.middleware.cors import CORSMiddleware
+
+logger = logging.getLogger(__name__)
+
+_LABEL = r"[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?"
+_PORT = r"[0-9]{1,5}"
+
+
+class OriginMatcher:
+    def __init__(self, exact: frozenset[str], pattern: Optional[re.Pattern]):
+        self.exact = exact
+        self.pattern = pattern
+
+    def __bool__(self) -> bool:
+        return bool(self.exact) or self.pattern is not None
+
+    def matches(self, origin: str) -> bool:
+        # Origin é só esquema://host[:porta], tudo case-insensitive; a config
+        # já foi normalizada em minúsculas no parse.
+        origin = origin.lower()
+        if origin in self.exact:
+            return True
+        return self.pattern is not None and self.pattern.fullmatch(origin) is not None
+
+
+def _wildcard_regex(origin: str) -> str:
+    scheme, sep, rest = origin.partition("://")
+    if not sep or not scheme or "*" in scheme:
+        raise ValueError(f"origem CORS inválida: {origin!r}")
+    host, colon, port = rest.partition(":")
+    labels = []
+    for label in host.split("."):
+        if label == "*":
+            labels.append(_LABEL)
+        elif "*" in label:
+            raise ValueError(f"curinga deve ocupar um rótulo inteiro: {origin!r}")
+        else:
+            labels.append(re.escape(label))
+    regex = re.escape(scheme) + "://" + r"\.".join(labels)
+    if colon:
+        regex += ":" + (_PORT if port == "*" else re.escape(port))
+    return regex
+
+
+def parse_origins(raw: str) -> OriginMatcher:
+    exact: set[str] = set()
+    patterns: list[str] = []
+    for entry in raw.split(","):
+        origin = entry.strip().rstrip("/").lower()
+        if not origin:
+            continue
+        if origin == "*":
+            logger.warning("ALLOWED_CORS_ORIGINS: '*' ignorado — liste as origens (curinga por rótulo)")
+            continue
+        if "*" not in origin:
+            exact.add(origin)
+            continue
+        try:
+            patterns.append(_wildcard_regex(origin))
+        except ValueError as e:
+            logger.warning("ALLOWED_CORS_ORIGINS: %s — ignorada", e)
+    pattern = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+    return OriginMatcher(frozenset(exact), pattern)
+
+
+def origins_from_env() -> OriginMatcher:
+    """`ALLOWED_CORS_ORIGINS` compilado. Vazio = bloqueio."""
+    matcher = parse_origins(os.getenv("ALLOWED_CORS_ORIGINS", ""))
+    if not matcher:
+        logger.warning(
+            "ALLOWED_CORS_ORIGINS vazio — CORS bloqueia origens externas. "
+            "Definir em produção."
+        )
+    return matcher
+
+
+def max_age_from_env() -> int:
+    try:
+        return max(0, int(os.getenv("CORS_MAX_AGE", "") or 86400))
+    except ValueError:
+        return 86400
+
+
+class OriginMatcherCORSMiddleware(CORSMiddleware):
+    """CORSMiddleware do Starlette com a checagem de origem do OriginMatcher
+    (a original faz busca linear na lista + regex opcional por request)."""
+
+    def __init__(self, app, *, origins: OriginMatcher, **kwargs):
+        super().__init__(app, allow_origins=(), **kwargs)
+        self.origins = origins
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        return self.origins.matches(origin)
@@ -0,0 +1,120 @@
+"""Deadline ponta a ponta por request.
+
+Sem isso um callback com a Meta lenta levava minutos (3 etapas × 3 tentativas
+× 30s), muito depois do navegador ter desistido. O endpoint abre um
+`deadline_scope(...)`; o prazo fica numa ContextVar e cada etapa consulta o
+orçamento restante:
+
+- chamadas à Meta: timeout por tentativa = min(30s, restante); retry que não
+  cabe no restante não é feito (`can_fit`);
+- Secret Manager / Firestore: `timeout=rpc_timeout()` nas RPCs;
+- prazo esgotado → `DeadlineExceeded` (main.py responde 504).
+
+Fora de um scope (scripts, workers de fundo) nada muda: `remaining()` é None
+e `rpc_timeout()` devolve o default da lib. Tasks criadas com
+`asyncio.create_task` herdam o contexto — jobs de fundo abrem o próprio scope.
+
+Envs:
+- CALLBACK_DEADLINE_S: orçamento do process-callback síncrono (default 30).
+- CALLBACK_DEADLINE_MAX_S: teto aceito do header do cliente (default 60).
+- CALLBACK_JOB_DEADLINE_S: orçamento do callback em modo async (default 120).
+
+Header opcional do cliente: `X-Request-Deadline-Ms` (orçamento restante, em ms,
+relativo — não depende de relógio sincronizado).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import os
+import time
+from typing import Iterator, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+CALLBACK_DEADLINE_S = _env_float("CALLBACK_DEADLINE_S", 30.0)
+CALLBACK_DEADLINE_MAX_S = _env_float("CALLBACK_DEADLINE_MAX_S", 60.0)
+CALLBACK_JOB_DEADLINE_S = _env_float("CALLBACK_JOB_DEADLINE_S", 120.0)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None,
+)
+
+
+class DeadlineExceeded(Exception):
+    """Orçamento de tempo da request esgotado."""
+
+    status_code = 504
+    detail = "Tempo limite da requisição esgotado. Tente novamente."
+
+    def __init__(self, stage: str = ""):
+        super().__init__(f"deadline esgotado{f' em {stage}' if stage else ''}")
+        self.stage = stage
+
+
+def budget_from_header(header_ms: Optional[str], default_s: float = CALLBACK_DEADLINE_S) -> float:
+    """Orçamento em segundos: header do cliente (limitado ao teto) ou o default."""
+    try:
+        requested = float(header_ms) / 1000.0 if header_ms else 0.0
+    except ValueError:
+        requested = 0.0
+    if requested <= 0:
+        return default_s
+    return min(requested, CALLBACK_DEADLINE_MAX_S)
+
+
+@contextlib.contextmanager
+def deadline_scope(budget_s: float) -> Iterator[None]:
+    """Define o prazo (agora + `budget_s`) para o código dentro do bloco."""
+    token = _deadline.set(time.monotonic() + budget_s)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Segundos restantes (pode ser <= 0), ou None sem deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check(stage: str = "") -> None:
+    rem = remaining()
+    if rem is not None and rem <= 0:
+        raise DeadlineExceeded(stage)
+
+
+def timeout_for(cap: float, stage: str = "") -> float:
+    """Timeout de uma operação: `cap` limitado ao restante. Esgotado → DeadlineExceeded."""
+    rem = remaining()
+    if rem is None:
+        return cap
+    if rem <= 0:
+        raise DeadlineExceeded(stage)
+    return min(cap, rem)
+
+
+def rpc_timeout(stage: str = "") -> Optional[float]:
+    """`timeout=` para RPCs do Google (None = default da lib, fora de um scope)."""
+    rem = remaining()
+    if rem is None:
+        return None
+    if rem <= 0:
+        raise DeadlineExceeded(stage)
+    return rem
+
+
+def can_fit(seconds: float) -> bool:
+    """True se ainda cabem `seconds` no orçamento (sempre True sem deadline)."""
+    rem = remaining()
+    return rem is None or rem > seconds
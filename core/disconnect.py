@@ -0,0 +1,139 @@
+"""Desconexão de contas Instagram (pelo usuário ou em lote pelo admin).
+
+Antes o suporte editava `instagram_accounts` à mão no Firestore e os secrets
+das api_keys ficavam para trás. `disconnect()`:
+
+1. por integração, remove as contas numa transação (core.accounts_store.
+   remove_accounts, qualquer layout) e invalida o cache da listagem;
+2. revoga os secrets das api_keys removidas — desabilita as versões, ou
+   destrói com `destroy=True`.
+
+As duas fases rodam num pool de threads limitado (`DISCONNECT_CONCURRENCY`,
+default 16): milhares de desconexões saem numa chamada sem estourar a cota
+do Firestore/Secret Manager. Falha de uma integração ou secret não interrompe
+as demais; tudo vai para `DisconnectReport.failures` — falha de secret leva o
+`api_key`, único registro do secret depois que a conta saiu do doc.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.cloud import firestore
+
+from core import events
+from core.accounts_cache import accounts_cache
+from core.accounts_store import remove_accounts
+from core.security import get_secret_manager_client, revoke_access_token
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DisconnectTarget:
+    user_uid: str
+    account_ids: Optional[frozenset[str]] = None  # None = todas as contas
+
+
+@dataclass
+class DisconnectReport:
+    integrations: int = 0
+    accounts_removed: int = 0
+    secrets_revoked: int = 0
+    failures: list[dict] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "status": "partial" if self.failures else "success",
+            "integrations": self.integrations,
+            "accounts_removed": self.accounts_removed,
+            "secrets_revoked": self.secrets_revoked,
+            "failures": self.failures,
+        }
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+DISCONNECT_CONCURRENCY = max(1, _env_int("DISCONNECT_CONCURRENCY", 16))
+
+_executor = ThreadPoolExecutor(max_workers=DISCONNECT_CONCURRENCY, thread_name_prefix="disconnect")
+
+
+async def disconnect(targets: list[DisconnectTarget], *, destroy: bool = False) -> DisconnectReport:
+    report = DisconnectReport()
+    if not targets:
+        return report
+    loop = asyncio.get_running_loop()
+    db = firestore.Client()
+    secrets_client = get_secret_manager_client()
+
+    def _remove(target: DisconnectTarget) -> list[dict]:
+        ref = db.collection("integrations").document(target.user_uid)
+        return remove_accounts(db, ref, None if target.account_ids is None else set(target.account_ids))
+
+    removals = await asyncio.gather(
+        *(loop.run_in_executor(_executor, _remove, t) for t in targets),
+        return_exceptions=True,
+    )
+
+    revocations: list[tuple[str, str, str]] = []  # (user_uid, account_id, api_key)
+    for target, removed in zip(targets, removals):
+        if isinstance(removed, BaseException):
+            logger.error("Falha desconectando contas user_uid=%s: %s", target.user_uid, removed)
+            report.failures.append({"user_uid": target.user_uid, "stage": "firestore", "error": str(removed)})
+            continue
+        found = {str(a.get("id")) for a in removed}
+        for account_id in sorted((target.account_ids or frozenset()) - found):
+            report.failures.append({"user_uid": target.user_uid, "account_id": account_id, "stage": "not_found"})
+        if not removed:
+            continue
+        accounts_cache.invalidate(target.user_uid)
+        report.integrations += 1
+        report.accounts_removed += len(removed)
+        for account in removed:
+            events.emit(
+                events.EVENT_DISCONNECT, user_uid=target.user_uid,
+                ig_user_id=str(account.get("id")), username=account.get("username") or None,
+            )
+            if account.get("api_key"):
+                revocations.append((target.user_uid, str(account.get("id")), account["api_key"]))
+
+    def _revoke(api_key: str) -> int:
+        return revoke_access_token(api_key, destroy=destroy, client=secrets_client)
+
+    results = await asyncio.gather(
+        *(loop.run_in_executor(_executor, _revoke, api_key) for _, _, api_key in revocations),
+        return_exceptions=True,
+    )
+    for (user_uid, account_id, api_key), result in zip(revocations, results):
+        if isinstance(result, BaseException):
+            # A conta já saiu do doc: o api_key (nome do secret, uuid) só fica
+            # aqui — sem ele o token vira órfão.
+            logger.error(
+                "Falha revogando secret user_uid=%s conta=%s api_key=%s: %s", user_uid, account_id, api_key, result,
+                extra={"event": "disconnect.secret_failed", "api_key": api_key},
+            )
+            report.failures.append({
+                "user_uid": user_uid, "account_id": account_id, "stage": "secret",
+                "error": str(result), "api_key": api_key,
+            })
+        else:
+            report.secrets_revoked += 1
+
+    logger.info(
+        "Desconexão: %d integrações, %d contas, %d secrets, %d falhas",
+        report.integrations, report.accounts_removed, report.secrets_revoked, len(report.failures),
+        extra={"event": "disconnect.done", "integrations": report.integrations,
+               "accounts_removed": report.accounts_removed, "failures": len(report.failures)},
+    )
+    return report
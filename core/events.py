@@ -0,0 +1,217 @@
+"""Log estruturado (append-only) dos desfechos do process-callback.
+
+Antes o único registro de conexão/reconexão/dedupe/conta inelegível/retry
+eram linhas de log em texto livre, raspadas pelos jobs de analytics. Aqui:
+
+- `ConnectionEvent`: schema tipado (kind em `EVENT_KINDS`);
+- `emit(kind, ...)`: no request só faz `deque.append` (O(1)); `user_uid` vem
+  do contexto (`bound(...)`), então helpers profundos (retries) emitem sem
+  receber o usuário;
+- `EventLog`: task de fundo grava em lote ao juntar `batch_size` eventos ou a
+  cada `flush_interval_s`; `stop()` no shutdown grava o que restou.
+
+Sinks (`CONNECTION_EVENTS_SINK`):
+- `firestore` (default): batch writes em `connection_events/{event_id}`
+  (ID do evento → regravar após falha não duplica);
+- `ndjson:/caminho/arquivo.ndjson`: append de 1 JSON por linha (`{pid}` no
+  caminho vira o PID — um arquivo por worker);
+- `off`: descarta.
+
+Buffer limitado (`CONNECTION_EVENTS_MAX_BUFFER`): se o sink ficar fora por
+muito tempo, os eventos mais antigos são descartados (contados em `dropped`).
+Por processo, em memória: kill -9 perde o lote corrente.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
+import contextvars
+import datetime as _dt
+import json
+import logging
+import os
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, Optional
+
+from google.cloud import firestore
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = "connection_events"
+
+EVENT_CONNECT = "connect"            # conta nova na integração (ou 1ª conexão)
+EVENT_RECONNECT = "reconnect"        # conta já conectada, token renovado
+EVENT_DEDUPE = "dedupe"              # clique duplo / Strict Mode: estado atual devolvido
+EVENT_INELIGIBLE = "ineligible"      # conta não Profissional
+EVENT_CODE_REUSED = "code_reused"    # code já usado: integração existente devolvida
+EVENT_RETRY = "retry"                # nova tentativa numa chamada à Meta
+EVENT_RETRY_SKIPPED = "retry_skipped"  # retry não feito: não cabia no deadline
+EVENT_DISCONNECT = "disconnect"      # conta removida (usuário ou admin)
+
+EVENT_KINDS = frozenset({
+    EVENT_CONNECT, EVENT_RECONNECT, EVENT_DEDUPE, EVENT_INELIGIBLE,
+    EVENT_CODE_REUSED, EVENT_RETRY, EVENT_RETRY_SKIPPED, EVENT_DISCONNECT,
+})
+
+_context: contextvars.ContextVar[dict] = contextvars.ContextVar("connection_event_context", default={})
+
+
+@dataclass(frozen=True)
+class ConnectionEvent:
+    kind: str
+    user_uid: Optional[str] = None
+    ig_user_id: Optional[str] = None
+    username: Optional[str] = None
+    stage: Optional[str] = None        # code_exchange | long_token_exchange | profile
+    attempt: Optional[int] = None
+    reason: Optional[str] = None
+    account_count: Optional[int] = None
+    event_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    occurred_at: _dt.datetime = field(default_factory=lambda: _dt.datetime.now(_dt.timezone.utc))
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+class FirestoreSink:
+    _MAX_BATCH = 500  # limite de escritas por batch do Firestore
+
+    def __init__(self, collection: str = EVENTS_COLLECTION):
+        self.collection = collection
+        self._db = None
+
+    def write(self, events: list[ConnectionEvent]) -> None:
+        if self._db is None:
+            self._db = firestore.Client()
+        for start in range(0, len(events), self._MAX_BATCH):
+            batch = self._db.batch()
+            for event in events[start:start + self._MAX_BATCH]:
+                batch.set(self._db.collection(self.collection).document(event.event_id), event.to_dict())
+            batch.commit()
+
+
+class NdjsonSink:
+    def __init__(self, path: str):
+        # `{pid}` resolvido a cada escrita, não aqui: o sink nasce no import
+        # do `main`, que com `preload_app` roda no master do gunicorn.
+        self.path_template = path
+
+    @property
+    def path(self) -> str:
+        return self.path_template.replace("{pid}", str(os.getpid()))
+
+    def write(self, events: list[ConnectionEvent]) -> None:
+        lines = "".join(
+            json.dumps({**e.to_dict(), "occurred_at": e.occurred_at.isoformat()}, ensure_ascii=False) + "\n"
+            for e in events
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class NullSink:
+    def write(self, events: list[ConnectionEvent]) -> None:
+        pass
+
+
+def sink_from_env(raw: Optional[str] = None):
+    raw = (raw if raw is not None else os.getenv("CONNECTION_EVENTS_SINK", "firestore")).strip()
+    if raw in ("", "off", "none"):
+        return NullSink()
+    if raw == "firestore":
+        return FirestoreSink()
+    if raw.startswith("ndjson:"):
+        return NdjsonSink(raw[len("ndjson:"):])
+    logger.warning("CONNECTION_EVENTS_SINK inválido (%r); eventos desligados", raw)
+    return NullSink()
+
+
+class EventLog:
+    def __init__(self, sink=None, *, batch_size: int = 200, flush_interval_s: float = 5.0, max_buffer: int = 10_000):
+        self.sink = sink if sink is not None else NullSink()
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._buffer: collections.deque[ConnectionEvent] = collections.deque(maxlen=max_buffer)
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.written = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def emit(self, kind: str, **fields) -> None:
+        """Enfileira um evento (O(1), sem I/O). Campos do contexto (`bound`) entram por baixo."""
+        if kind not in EVENT_KINDS:
+            logger.warning("Evento de conexão desconhecido: %s", kind)
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(ConnectionEvent(kind=kind, **{**_context.get(), **fields}))
+        if self._wake is not None and len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout_s: float = 10.0) -> None:
+        """Para a task e grava o que restou no buffer (best-effort, com timeout)."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        try:
+            await asyncio.wait_for(self.flush(), timeout_s)
+        except Exception as e:
+            logger.error("Eventos de conexão perdidos no shutdown (%d): %s", len(self._buffer), e)
+
+    async def flush(self) -> None:
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                await asyncio.to_thread(self.sink.write, batch)
+            except Exception as e:
+                # Devolve ao início do buffer; próxima rodada tenta de novo.
+                self._buffer.extendleft(reversed(batch))
+                logger.error("Falha gravando %d eventos de conexão: %s", len(batch), e)
+                return
+            self.written += len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval_s)
+            self._wake.clear()
+            await self.flush()
+
+
+@contextlib.contextmanager
+def bound(**fields) -> Iterator[None]:
+    """Campos (ex.: user_uid) anexados a todo evento emitido dentro do bloco."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+event_log = EventLog(
+    sink_from_env(),
+    batch_size=_env_int("CONNECTION_EVENTS_BATCH_SIZE", 200),
+    flush_interval_s=float(_env_int("CONNECTION_EVENTS_FLUSH_INTERVAL_S", 5)),
+    max_buffer=_env_int("CONNECTION_EVENTS_MAX_BUFFER", 10_000),
+)
+emit = event_log.emit
@@ -0,0 +1,85 @@
+"""Varredura paginada (cursor) de coleções Firestore + checkpoint em disco.
+
+`stream()` numa coleção grande segura um RPC aberto por minutos e estoura
+deadline; aqui lemos páginas de `page_size` documentos ordenadas pelo ID,
+retomando de `start_after` (o último ID processado). Memória constante: só a
+página corrente fica em memória.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from typing import Iterator, Optional
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 300
+
+
+def iter_pages(
+    collection_ref,
+    *,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    start_after: Optional[str] = None,
+) -> Iterator[list]:
+    """Gera listas de DocumentSnapshot, página a página, em ordem de ID."""
+    cursor = start_after
+    while True:
+        query = collection_ref.order_by(FieldPath.document_id()).limit(page_size)
+        if cursor:
+            query = query.start_after({FieldPath.document_id(): cursor})
+        page = list(query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = page[-1].id
+
+
+class Checkpoint:
+    """Progresso de um job de varredura, persistido em JSON (escrita atômica).
+
+    `last_doc_id` é o cursor de retomada; `counters` são contadores livres
+    (processados, alterados, erros...); `failed_ids` os docs que falharam
+    (para inspeção — a retomada os refaz se o cursor não passou deles).
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.last_doc_id: Optional[str] = None
+        self.counters: dict[str, int] = {}
+        self.failed_ids: list[str] = []
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            self.last_doc_id = raw.get("last_doc_id")
+            self.counters = dict(raw.get("counters") or {})
+            self.failed_ids = list(raw.get("failed_ids") or [])
+            logger.info("Retomando do checkpoint %s (last_doc_id=%s)", path, self.last_doc_id)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_failure(self, doc_id: str) -> None:
+        if doc_id not in self.failed_ids:
+            self.failed_ids.append(doc_id)
+
+    def clear_failure(self, doc_id: str) -> None:
+        if doc_id in self.failed_ids:
+            self.failed_ids.remove(doc_id)
+
+    def save(self, last_doc_id: Optional[str]) -> None:
+        self.last_doc_id = last_doc_id
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"last_doc_id": last_doc_id, "counters": self.counters, "failed_ids": self.failed_ids}, f)
+        os.replace(tmp, self.path)
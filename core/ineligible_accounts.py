@@ -0,0 +1,66 @@
+"""Cache negativo de contas IG não elegíveis (não Profissionais).
+
+Conta pessoal falha na troca short→long com o MESMO erro (code 100,
+"Unsupported request - method type: get") que o glitch transitório de
+roteamento da Meta — por isso o erro é retentado (3 tentativas + backoff) e
+depois ainda vem um /me de diagnóstico que também falha. Para quem já sabemos
+que é inelegível isso só atrasa a mensagem "mude para Profissional".
+
+Aqui guardamos o `ig_user_id` (vem na troca do code, antes do short→long)
+das contas classificadas como inelegíveis, por `INELIGIBLE_CACHE_TTL_S`
+(default 6h): na próxima tentativa da mesma conta o short→long tem uma só
+tentativa. Conexão bem-sucedida tira a conta do cache (usuário mudou o tipo).
+
+Por processo, em memória, LRU limitado: outra instância só aprende na 1ª
+falha dela. Não é thread-safe (uso no event loop).
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class IneligibleAccounts:
+    def __init__(self, ttl_s: float = 6 * 3600, max_entries: int = 50_000):
+        self.ttl_s = ttl_s
+        self._max_entries = max_entries
+        self._expires: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def __contains__(self, ig_user_id: Optional[str]) -> bool:
+        if not ig_user_id:
+            return False
+        expires = self._expires.get(ig_user_id)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._expires[ig_user_id]
+            return False
+        return True
+
+    def mark(self, ig_user_id: Optional[str]) -> None:
+        if not ig_user_id or self.ttl_s <= 0:
+            return
+        self._expires[ig_user_id] = time.monotonic() + self.ttl_s
+        self._expires.move_to_end(ig_user_id)
+        if len(self._expires) > self._max_entries:
+            self._expires.popitem(last=False)
+
+    def discard(self, ig_user_id: Optional[str]) -> None:
+        if ig_user_id:
+            self._expires.pop(ig_user_id, None)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+ineligible_accounts = IneligibleAccounts(ttl_s=_env_float("INELIGIBLE_CACHE_TTL_S", 6 * 3600))
@@ -0,0 +1,106 @@
+"""Export NDJSON da coleção `integrations` (relatórios), sem tokens.
+
+Usado pelo endpoint GET /admin/integrations/export (StreamingResponse) e por
+`scripts/export_integrations.py`. Leitura paginada por cursor
+(core.firestore_scan.iter_pages) e saída em blocos de uma página: a memória
+fica em uma página de integrações, qualquer que seja o tamanho da coleção.
+No endpoint o gerador é síncrono — o Starlette o itera em threadpool e só
+pede o próximo bloco depois que o anterior foi enviado (backpressure do
+cliente chega até a leitura do Firestore).
+
+Uma linha por integração:
+
+    {"user_uid", "status", "platform", "auth_provider", "created_at",
+     "updated_at", "token_expires_in_seconds", "account_count",
+     "accounts": [{"id", "username", "name", "account_type", "active", ...}]}
+
+Nunca sai `api_key` (nome do secret do token) nem campo de token. `fields`
+projeta: nomes de topo (`status`) e de conta (`accounts.username`); sem
+nenhum campo de conta pedido, as subcoleções nem são lidas.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Optional
+
+import pydantic_core
+
+from core.accounts_store import load_accounts
+from core.firestore_scan import DEFAULT_PAGE_SIZE, iter_pages
+
+INTEGRATION_FIELDS = (
+    "user_uid", "status", "platform", "auth_provider", "accounts_layout",
+    "created_at", "updated_at", "token_expires_in_seconds", "account_count", "accounts",
+)
+ACCOUNT_FIELDS = (
+    "id", "username", "name", "account_type", "active", "followers_count",
+    "media_count", "token_expires_in_seconds", "deauthorized_at",
+)
+
+
+class InvalidFieldsError(ValueError):
+    """Projeção com campo desconhecido."""
+
+
+def parse_fields(raw: Optional[str]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """`"user_uid,status,accounts.username"` → (campos de topo, campos de conta)."""
+    if not raw or not raw.strip():
+        return INTEGRATION_FIELDS, ACCOUNT_FIELDS
+    top: list[str] = []
+    account: list[str] = []
+    for name in (f.strip() for f in raw.split(",")):
+        if not name:
+            continue
+        if name.startswith("accounts."):
+            sub = name[len("accounts."):]
+            if sub not in ACCOUNT_FIELDS:
+                raise InvalidFieldsError(f"campo de conta desconhecido: {sub}")
+            account.append(sub)
+        elif name in INTEGRATION_FIELDS:
+            top.append(name)
+        else:
+            raise InvalidFieldsError(f"campo desconhecido: {name}")
+    if account and "accounts" not in top:
+        top.append("accounts")
+    elif "accounts" in top and not account:
+        account = list(ACCOUNT_FIELDS)
+    return tuple(top), tuple(account)
+
+
+def _record(snap, top: tuple[str, ...], account_fields: tuple[str, ...]) -> dict:
+    data = snap.to_dict() or {}
+    record = {}
+    for name in top:
+        if name == "user_uid":
+            record[name] = data.get("user_uid") or snap.id
+        elif name == "accounts":
+            record[name] = [
+                {f: account.get(f) for f in account_fields if f in account}
+                for account in load_accounts(snap.reference, data)
+            ]
+        elif name in data:
+            record[name] = data[name]
+    return record
+
+
+def iter_records(
+    db,
+    *,
+    fields: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    start_after: Optional[str] = None,
+) -> Iterator[list[dict]]:
+    """Páginas de registros (dicts já projetados)."""
+    top, account_fields = parse_fields(fields)
+    for page in iter_pages(db.collection("integrations"), page_size=page_size, start_after=start_after):
+        yield [_record(snap, top, account_fields) for snap in page]
+
+
+def to_ndjson(records: Iterable[dict]) -> bytes:
+    return b"".join(pydantic_core.to_json(r, fallback=str) + b"\n" for r in records)
+
+
+def iter_ndjson(db, **kwargs) -> Iterator[bytes]:
+    """Um bloco NDJSON por página (`kwargs` como em iter_records)."""
+    for page in iter_records(db, **kwargs):
+        yield to_ndjson(page)
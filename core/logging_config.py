@@ -0,0 +1,187 @@
+"""Logging estruturado (JSON) e não-bloqueante.
+
+O `logging.basicConfig` antigo formatava e escrevia no stdout dentro do event
+loop a cada `logger.info`. Aqui:
+
+- O root logger recebe um `QueueHandler` que só enfileira o `LogRecord`
+  (sem formatar — `msg % args` fica para depois).
+- Um `QueueListener` numa thread dedicada formata em JSON (uma linha por
+  registro, formato que o Cloud Logging entende: `severity`, `message`, ...)
+  e escreve no stdout.
+- Registros INFO/DEBUG marcados com `extra={"event": "<classe>"}` podem ser
+  amostrados por classe (`LOG_SAMPLE_RATES`) antes de entrar na fila.
+  WARNING+ nunca é amostrado.
+
+Envs:
+- LOG_LEVEL: nível do root (default INFO).
+- LOG_FORMAT: `json` (default) ou `text` (dev local).
+- LOG_SAMPLE_RATES: CSV `classe=taxa`, ex. `auth.token_verified=0.01`.
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime as _dt
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+# Atributos padrão de LogRecord — tudo fora disso veio de `extra=` e vai
+# para o JSON como campo estruturado.
+_RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys()
+) | {"message", "asctime", "taskName"}
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.handlers.QueueHandler | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formata LogRecord como uma linha JSON (compatível com Cloud Logging)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": _dt.datetime.fromtimestamp(record.created, _dt.timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Amostra registros de baixa severidade por classe de mensagem.
+
+    A classe é o atributo `event` do registro (`extra={"event": ...}`).
+    Registros sem `event`, ou com nível >= WARNING, passam sempre.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None:
+            return True
+        return random.random() < rate
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que NÃO formata no caller.
+
+    O `prepare` padrão chama `self.format(record)` (JSON, timestamp, traceback
+    — custo no event loop). Aqui só a mensagem é resolvida (`msg % args`):
+    `args` mutáveis (dicts de resposta reaproveitados entre tentativas) não
+    podem ser lidos depois, na thread do listener. O resto da formatação fica
+    para o listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _parse_sample_rates(raw: str) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for item in raw.split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            rates[name.strip()] = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+def setup_logging(stream=None) -> None:
+    """Instala o pipeline fila → thread → stdout no root logger. Idempotente.
+
+    `stream`: destino dos logs (default stdout). CLIs que escrevem dados no
+    stdout passam `sys.stderr`.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    if os.getenv("LOG_FORMAT", "json").strip().lower() == "text":
+        formatter: logging.Formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(message)s"
+        )
+    else:
+        formatter = JsonFormatter()
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _LazyQueueHandler(log_queue)
+    queue_handler.addFilter(
+        SamplingFilter(_parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")))
+    )
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _queue_handler = queue_handler
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def _reinit_after_fork() -> None:
+    """Threads não sobrevivem ao fork: com `preload_app` (gunicorn) o listener
+    existe só no master. No filho, recria fila + thread com os mesmos handlers."""
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(
+        log_queue, *_listener.handlers, respect_handler_level=True
+    )
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
+
+
+def shutdown_logging() -> None:
+    """Drena a fila e para a thread do listener (shutdown do app / atexit).
+
+    Os handlers do listener passam a ficar direto no root: log emitido depois
+    (fim do lifespan, atexit) sai síncrono em vez de sumir na fila parada.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    queue_handler, _queue_handler = _queue_handler, None
+    root = logging.getLogger()
+    if queue_handler is not None:
+        root.removeHandler(queue_handler)
+        for handler in listener.handlers:
+            for log_filter in queue_handler.filters:
+                handler.addFilter(log_filter)
+            root.addHandler(handler)
+    listener.stop()
@@ -0,0 +1,332 @@
+"""Callbacks de desautorização e exclusão de dados da Meta.
+
+Quando o usuário remove o app no Instagram, a Meta envia um POST com
+`signed_request` (HMAC-SHA256 com o app secret). O endpoint só verifica a
+assinatura, enfileira e responde; a limpeza roda em lote num worker de fundo:
+
+- acha as integrações pela conta (`account_ids` array-contains-any — docs
+  legados sem esse resumo: `scripts.backfill_integrations --steps account_index`);
+- marca as contas `active=False` (transação por integração; raiz vira
+  `status=inactive` se não sobrar conta ativa);
+- desabilita as versões do secret de cada api_key (destrói, em exclusão de dados);
+- grava `data_deletion_requests/{confirmation_code}` como `completed`.
+
+Lote que falha é reaplicado com backoff exponencial (`max_attempts`
+tentativas); esgotadas, os pedidos de exclusão do lote vão para `failed`
+(visível no link de status) em vez de ficarem `pending` para sempre.
+
+A fila é por processo e em memória: o ack à Meta vem antes da limpeza.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import datetime as _dt
+import hashlib
+import hmac
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.cloud import firestore
+
+from core.accounts_cache import accounts_cache
+from core.accounts_store import LAYOUT_SUBCOLLECTION, accounts_collection, layout_of
+from core.security import get_secret_manager_client, revoke_access_token
+
+logger = logging.getLogger(__name__)
+
+KIND_DEAUTHORIZE = "deauthorize"
+KIND_DATA_DELETION = "data_deletion"
+DATA_DELETION_COLLECTION = "data_deletion_requests"
+
+# Limite do Firestore para valores em array-contains-any.
+_ARRAY_CONTAINS_ANY_MAX = 30
+
+
+class InvalidSignedRequestError(Exception):
+    """signed_request malformado ou com assinatura inválida."""
+
+
+class SecretRevocationError(Exception):
+    """Lote com secret não revogado: o lote inteiro é refeito (idempotente)."""
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def parse_signed_request(signed_request: str, app_secret: str) -> dict:
+    """Valida `<sig>.<payload>` (base64url) e retorna o payload decodificado."""
+    try:
+        encoded_sig, encoded_payload = signed_request.split(".", 1)
+        signature = _b64url_decode(encoded_sig)
+        payload = json.loads(_b64url_decode(encoded_payload))
+    except Exception as e:
+        raise InvalidSignedRequestError(f"signed_request malformado: {e}")
+
+    if str(payload.get("algorithm", "")).upper() != "HMAC-SHA256":
+        raise InvalidSignedRequestError(f"algoritmo não suportado: {payload.get('algorithm')}")
+    expected = hmac.new(
+        app_secret.encode("utf-8"), encoded_payload.encode("utf-8"), hashlib.sha256
+    ).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise InvalidSignedRequestError("assinatura do signed_request não bate")
+    if not payload.get("user_id"):
+        raise InvalidSignedRequestError("signed_request sem user_id")
+    return payload
+
+
+@dataclass
+class DeauthJob:
+    kind: str
+    ig_user_id: str
+    confirmation_code: Optional[str] = None
+    received_at: _dt.datetime = field(default_factory=lambda: _dt.datetime.now(_dt.timezone.utc))
+
+
+def _deactivate_accounts(db, integration_ref, account_ids: set[str]) -> list[str]:
+    """Marca as contas inativas (transação). Retorna as api_keys afetadas."""
+
+    @firestore.transactional
+    def _run(transaction) -> list[str]:
+        snap = integration_ref.get(transaction=transaction)
+        if not snap.exists:
+            return []
+        data = snap.to_dict() or {}
+        api_keys: list[str] = []
+        any_active = False
+
+        if layout_of(data) == LAYOUT_SUBCOLLECTION:
+            # Materializa antes de escrever: transação não permite leitura após escrita.
+            account_snaps = list(accounts_collection(integration_ref).stream(transaction=transaction))
+            for account_snap in account_snaps:
+                account = account_snap.to_dict() or {}
+                if account_snap.id in account_ids:
+                    if account.get("api_key"):
+                        api_keys.append(account["api_key"])
+                    if account.get("active", True):
+                        transaction.update(account_snap.reference, {
+                            "active": False,
+                            "deauthorized_at": firestore.SERVER_TIMESTAMP,
+                        })
+                elif account.get("active", True):
+                    any_active = True
+            root_updates: dict = {}
+        else:
+            accounts = []
+            for account in data.get("instagram_accounts") or []:
+                if str(account.get("id")) in account_ids:
+                    if account.get("api_key"):
+                        api_keys.append(account["api_key"])
+                    account = {**account, "active": False}
+                elif account.get("active", True):
+                    any_active = True
+                accounts.append(account)
+            root_updates = {"instagram_accounts": accounts}
+
+        root_updates["updated_at"] = firestore.SERVER_TIMESTAMP
+        if not any_active:
+            root_updates["status"] = "inactive"
+        transaction.update(integration_ref, root_updates)
+        return api_keys
+
+    return _run(db.transaction())
+
+
+def apply_batch(db, jobs: list[DeauthJob], *, secrets_client, executor: ThreadPoolExecutor) -> dict:
+    """Aplica um lote de jobs (bloqueante — roda fora do event loop)."""
+    destroy_ids = {j.ig_user_id for j in jobs if j.kind == KIND_DATA_DELETION}
+    ids = sorted({j.ig_user_id for j in jobs})
+    counters = {"jobs": len(jobs), "integrations": 0, "secrets": 0, "secret_errors": 0}
+
+    integrations: dict = {}
+    for start in range(0, len(ids), _ARRAY_CONTAINS_ANY_MAX):
+        chunk = ids[start:start + _ARRAY_CONTAINS_ANY_MAX]
+        query = db.collection("integrations").where(
+            filter=firestore.FieldFilter("account_ids", "array_contains_any", chunk)
+        )
+        for snap in query.stream():
+            integrations[snap.id] = snap
+
+    revocations: list[tuple[str, bool]] = []
+    for snap in integrations.values():
+        targets = {str(i) for i in (snap.get("account_ids") or [])} & set(ids)
+        api_keys = _deactivate_accounts(db, snap.reference, targets)
+        accounts_cache.invalidate(snap.id)
+        destroy = bool(targets & destroy_ids)
+        revocations.extend((key, destroy) for key in api_keys)
+        counters["integrations"] += 1
+
+    def _revoke(item: tuple[str, bool]) -> bool:
+        api_key, destroy = item
+        try:
+            revoke_access_token(api_key, destroy=destroy, client=secrets_client)
+            return True
+        except Exception as e:
+            logger.error("Falha revogando secret api_key=%s: %s", api_key, e)
+            return False
+
+    for ok in executor.map(_revoke, revocations):
+        counters["secrets" if ok else "secret_errors"] += 1
+    if counters["secret_errors"]:
+        # Sem `completed`: o retry relê as api_keys (desativação não as
+        # esconde) e revoga de novo; esgotado, os pedidos viram `failed`.
+        raise SecretRevocationError(
+            f"{counters['secret_errors']} de {len(revocations)} secrets não revogados"
+        )
+
+    deletions = [j for j in jobs if j.kind == KIND_DATA_DELETION and j.confirmation_code]
+    if deletions:
+        batch = db.batch()
+        for job in deletions:
+            batch.set(db.collection(DATA_DELETION_COLLECTION).document(job.confirmation_code), {
+                "ig_user_id": job.ig_user_id,
+                "status": "completed",
+                "requested_at": job.received_at,
+                "completed_at": firestore.SERVER_TIMESTAMP,
+            })
+        batch.commit()
+    return counters
+
+
+def mark_failed(db, jobs: list[DeauthJob], error: str) -> int:
+    """Grava `failed` nos pedidos de exclusão do lote. Retorna quantos."""
+    deletions = [j for j in jobs if j.kind == KIND_DATA_DELETION and j.confirmation_code]
+    if deletions:
+        batch = db.batch()
+        for job in deletions:
+            batch.set(db.collection(DATA_DELETION_COLLECTION).document(job.confirmation_code), {
+                "ig_user_id": job.ig_user_id,
+                "status": "failed",
+                "requested_at": job.received_at,
+                "failed_at": firestore.SERVER_TIMESTAMP,
+                "error": error,
+            })
+        batch.commit()
+    return len(deletions)
+
+
+class DeauthQueue:
+    """Fila em memória + worker que aplica jobs em lotes (tamanho ou tempo)."""
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        batch_size: int = 100,
+        max_wait_s: float = 2.0,
+        max_attempts: int = 5,
+        backoff_s: float = 1.0,
+    ):
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_s = backoff_s
+        self._queue: asyncio.Queue[DeauthJob] = asyncio.Queue(maxsize=maxsize)
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+        self._secrets_client = None
+        # 1 thread aplica os lotes em série; outro pool revoga secrets em paralelo.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="deauth")
+        self._revoke_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="deauth-revoke")
+
+    def submit(self, job: DeauthJob) -> bool:
+        """Enfileira sem bloquear. False se a fila está cheia (job descartado)."""
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            logger.error(
+                "Fila de deauth cheia — descartando %s ig_user_id=%s", job.kind, job.ig_user_id,
+                extra={"event": "deauth.dropped", "ig_user_id": job.ig_user_id},
+            )
+            return False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout_s: float = 10.0) -> None:
+        """Para o worker e aplica o que restou na fila (best-effort, com timeout)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        remaining = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if remaining:
+            try:
+                await asyncio.wait_for(self._apply(remaining), timeout_s)
+            except Exception as e:
+                logger.error("Deauth: %d jobs perdidos no shutdown: %s", len(remaining), e)
+
+    async def _next_batch(self) -> list[DeauthJob]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait_s
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _apply(self, batch: list[DeauthJob]) -> None:
+        if self._db is None:
+            self._db = firestore.Client()
+            self._secrets_client = get_secret_manager_client()
+        loop = asyncio.get_running_loop()
+        counters = await loop.run_in_executor(
+            self._executor,
+            lambda: apply_batch(
+                self._db, batch, secrets_client=self._secrets_client, executor=self._revoke_executor,
+            ),
+        )
+        logger.info("Deauth lote aplicado: %s", counters, extra={"event": "deauth.batch", **counters})
+
+    async def _apply_with_retry(self, batch: list[DeauthJob]) -> None:
+        """Reaplica o lote com backoff (as operações são idempotentes); esgotadas
+        as tentativas, marca os pedidos de exclusão como `failed`."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._apply(batch)
+                return
+            except Exception as e:
+                error = e
+                logger.warning(
+                    "Falha aplicando lote de deauth (tentativa %d/%d, %d jobs): %s",
+                    attempt, self.max_attempts, len(batch), e,
+                )
+            if attempt < self.max_attempts:
+                await asyncio.sleep(self.backoff_s * 2 ** (attempt - 1))
+
+        logger.error(
+            "Lote de deauth desistido após %d tentativas (%d jobs, ig_user_ids=%s): %s",
+            self.max_attempts, len(batch), [j.ig_user_id for j in batch], error,
+            exc_info=error, extra={"event": "deauth.failed", "jobs": len(batch)},
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._executor, lambda: mark_failed(self._db or firestore.Client(), batch, str(error)),
+            )
+        except Exception as e:
+            logger.error("Falha marcando pedidos de exclusão como failed: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            await self._apply_with_retry(batch)
+
+
+deauth_queue = DeauthQueue()
@@ -0,0 +1,181 @@
+"""Profiling por amostragem de requests em produção (opt-in).
+
+Quando a latência do callback regride em produção não havia como ver onde.
+`ProfilingMiddleware` (ASGI puro) roda o pyinstrument — profiler por
+amostragem com pilhas asyncio (`async_mode="enabled"`: o tempo em `await`
+aparece atribuído à coroutine que esperava) — em:
+
+- uma fração `PROFILE_SAMPLE_RATE` das requests (ex.: 0.01), ou
+- requests com header `X-Profile-Token` igual a `PROFILING_ADMIN_TOKEN`
+  (comparação em tempo constante).
+
+No máximo um profile por vez por processo (o profiler é por thread e um
+segundo perfil concorrente misturaria pilhas); request sorteada com outro em
+andamento segue sem profile. Os profiles ficam num anel em memória
+(`PROFILE_RING_SIZE`, default 20) e são lidos em /admin/profiles.
+
+Custo com tudo desligado: zero — `main.py` nem instala o middleware se não
+há taxa nem token configurados. `pyinstrument` é importado só no primeiro
+profile; sem o pacote, o middleware loga uma vez e segue sem profiling.
+"""
+
+from __future__ import annotations
+
+import collections
+import datetime as _dt
+import hmac
+import logging
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+PROFILE_SAMPLE_RATE = min(1.0, max(0.0, _env_float("PROFILE_SAMPLE_RATE", 0.0)))
+PROFILE_INTERVAL_S = _env_float("PROFILE_INTERVAL_S", 0.001)
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+
+
+@dataclass
+class StoredProfile:
+    method: str
+    path: str
+    status_code: Optional[int]
+    duration_s: float
+    trigger: str  # sample | header
+    session: object = field(repr=False)  # pyinstrument.session.Session
+    profile_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    captured_at: _dt.datetime = field(default_factory=lambda: _dt.datetime.now(_dt.timezone.utc))
+
+    def summary(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration_s * 1000, 1),
+            "trigger": self.trigger,
+            "captured_at": self.captured_at.isoformat(),
+        }
+
+
+class ProfileStore:
+    """Anel limitado dos últimos profiles (mais antigo sai)."""
+
+    def __init__(self, size: int):
+        self._ring: collections.deque[StoredProfile] = collections.deque(maxlen=size)
+
+    def add(self, profile: StoredProfile) -> None:
+        self._ring.append(profile)
+
+    def list(self) -> list[dict]:
+        return [p.summary() for p in reversed(self._ring)]
+
+    def get(self, profile_id: str) -> Optional[StoredProfile]:
+        return next((p for p in self._ring if p.profile_id == profile_id), None)
+
+    def clear(self) -> None:
+        self._ring.clear()
+
+
+profile_store = ProfileStore(int(_env_float("PROFILE_RING_SIZE", 20)))
+
+
+def render(profile: StoredProfile, fmt: str) -> tuple[str, str]:
+    """(conteúdo, media type) em `text`, `html` ou `speedscope`."""
+    from pyinstrument import renderers
+
+    if fmt == "html":
+        return renderers.HTMLRenderer().render(profile.session), "text/html"
+    if fmt == "speedscope":
+        return renderers.SpeedscopeRenderer().render(profile.session), "application/json"
+    return renderers.ConsoleRenderer(unicode=True, color=False, show_all=False).render(profile.session), "text/plain"
+
+
+def profiling_enabled() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 or bool(PROFILING_ADMIN_TOKEN)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, *, sample_rate: float = PROFILE_SAMPLE_RATE, admin_token: str = PROFILING_ADMIN_TOKEN,
+                 store: ProfileStore = profile_store, interval_s: float = PROFILE_INTERVAL_S):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token.encode("utf-8")
+        self.store = store
+        self.interval_s = interval_s
+        self._busy = False
+        self._profiler_cls = None
+        self._unavailable = False
+
+    def _trigger(self, scope) -> Optional[str]:
+        if self.admin_token:
+            for name, value in scope.get("headers") or ():
+                if name == PROFILE_HEADER:
+                    return "header" if hmac.compare_digest(value, self.admin_token) else None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def _load_profiler(self):
+        if self._profiler_cls is None and not self._unavailable:
+            try:
+                from pyinstrument import Profiler
+                self._profiler_cls = Profiler
+            except ImportError:
+                self._unavailable = True
+                logger.warning("Profiling ligado mas pyinstrument não está instalado; ignorando")
+        return self._profiler_cls
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._busy:
+            return await self.app(scope, receive, send)
+        trigger = self._trigger(scope)
+        profiler_cls = self._load_profiler() if trigger else None
+        if profiler_cls is None:
+            return await self.app(scope, receive, send)
+
+        self._busy = True
+        status_code: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler = profiler_cls(interval=self.interval_s, async_mode="enabled")
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session = profiler.stop()
+            self._busy = False
+            profile = StoredProfile(
+                method=scope.get("method", ""),
+                path=scope.get("path", ""),
+                status_code=status_code,
+                duration_s=time.perf_counter() - started,
+                trigger=trigger,
+                session=session,
+            )
+            self.store.add(profile)
+            logger.info(
+                "Profile capturado %s %s (%.0fms, %s) id=%s", profile.method, profile.path,
+                profile.duration_s * 1000, trigger, profile.profile_id,
+                extra={"event": "profiling.captured", "profile_id": profile.profile_id},
+            )
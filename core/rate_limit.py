@@ -0,0 +1,227 @@
+"""Rate limiting token-bucket por usuário e por IP.
+
+Um frontend em loop chamando /login ou /process-callback queima o rate limit
+do app Meta e a cota do Secret Manager (cada callback cria um secret). Aqui:
+
+- `LocalTokenBucket`: buckets em memória (dict LRU limitado), O(1) por
+  checagem — custo na casa de microssegundos, sem I/O.
+- `RedisTokenBucket` (opcional, `RATE_LIMIT_REDIS_URL`): bucket compartilhado
+  entre instâncias/workers via script Lua atômico. Só é consultado se o bucket
+  local liberou, e falha ABERTO (erro/timeout no Redis não bloqueia login).
+
+Envs:
+- RATE_LIMIT_ENABLED: `0` desliga (default ligado).
+- RATE_LIMIT_USER_PER_MINUTE: requests por user_uid por endpoint (default 10;
+  `0` desliga só este limite).
+- RATE_LIMIT_IP_PER_MINUTE: requests por IP por endpoint (default 30; `0` idem).
+- RATE_LIMIT_REDIS_URL: habilita backend compartilhado (requer `redis`).
+- RATE_LIMIT_TRUSTED_PROXY_HOPS: proxies confiáveis no X-Forwarded-For (default 1).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Limite de chaves no backend local — evita crescer sem fim com IPs variados.
+_LOCAL_MAX_KEYS = 50_000
+
+
+class RateLimitExceeded(Exception):
+    """Bucket vazio para a chave. `retry_after` em segundos (inteiro >= 1)."""
+
+    def __init__(self, key: str, retry_after: int):
+        super().__init__(f"rate limit excedido para {key}")
+        self.key = key
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """`capacity` tokens de burst, reabastecidos a `refill_per_second`.
+
+    Taxa > 0 e capacidade >= 1 obrigatórias: o Retry-After, o pacing do
+    `acquire` e o EXPIRE do Lua dividem pela taxa.
+    """
+
+    capacity: float
+    refill_per_second: float
+
+    def __post_init__(self):
+        if self.refill_per_second <= 0 or self.capacity < 1:
+            raise ValueError(
+                f"regra de rate limit inválida (capacity={self.capacity}, refill={self.refill_per_second}/s)"
+            )
+
+    @classmethod
+    def per_minute(cls, n: int) -> "RateLimitRule":
+        return cls(capacity=float(n), refill_per_second=n / 60.0)
+
+    def retry_after(self, tokens: float) -> int:
+        return max(1, math.ceil((1.0 - tokens) / self.refill_per_second))
+
+
+class LocalTokenBucket:
+    """Token bucket em memória do processo. Não é thread-safe (uso no event loop)."""
+
+    def __init__(self, max_keys: int = _LOCAL_MAX_KEYS):
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._max_keys = max_keys
+
+    def _take(self, key: str, rule: RateLimitRule, now: float) -> Optional[float]:
+        """Consome 1 token; se não há, retorna os tokens atuais (< 1)."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = rule.capacity
+        else:
+            tokens, last = bucket
+            tokens = min(rule.capacity, tokens + (now - last) * rule.refill_per_second)
+            self._buckets.move_to_end(key)
+
+        if tokens < 1.0:
+            self._buckets[key] = (tokens, now)
+            return tokens
+
+        self._buckets[key] = (tokens - 1.0, now)
+        if len(self._buckets) > self._max_keys:
+            self._buckets.popitem(last=False)
+        return None
+
+    def consume(self, key: str, rule: RateLimitRule, now: Optional[float] = None) -> Optional[int]:
+        """Consome 1 token. Retorna None se liberado, senão o Retry-After."""
+        tokens = self._take(key, rule, time.monotonic() if now is None else now)
+        return None if tokens is None else rule.retry_after(tokens)
+
+    async def acquire(self, key: str, rule: RateLimitRule) -> None:
+        """Espera até haver token (uso em jobs de fundo que querem pacing, não 429)."""
+        while True:
+            tokens = self._take(key, rule, time.monotonic())
+            if tokens is None:
+                return
+            await asyncio.sleep((1.0 - tokens) / rule.refill_per_second)
+
+
+# KEYS[1]=chave; ARGV: capacity, refill/s, now(s). Retorna {liberado, tokens}.
+_REDIS_TOKEN_BUCKET_LUA = """
+local b = redis.call('HMGET', KEYS[1], 't', 'ts')
+local cap = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+local ok = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  ok = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(cap / rate) + 1)
+return {ok, tostring(tokens)}
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket compartilhado em Redis (dependência opcional)."""
+
+    def __init__(self, url: str, timeout_s: float = 0.05):
+        import redis.asyncio as redis_asyncio  # opcional: só com RATE_LIMIT_REDIS_URL
+
+        self._client = redis_asyncio.from_url(
+            url, socket_timeout=timeout_s, socket_connect_timeout=timeout_s
+        )
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET_LUA)
+
+    async def consume(self, key: str, rule: RateLimitRule) -> Optional[int]:
+        try:
+            ok, tokens = await self._script(
+                keys=[f"ratelimit:{key}"],
+                args=[rule.capacity, rule.refill_per_second, time.time()],
+            )
+        except Exception as e:
+            # Falha aberto: Redis fora não derruba o fluxo OAuth.
+            logger.warning("Rate limit Redis indisponível (liberando): %s", e)
+            return None
+        if int(ok):
+            return None
+        return rule.retry_after(float(tokens))
+
+
+class RateLimiter:
+    """Combina backend local (sempre) + compartilhado (opcional)."""
+
+    def __init__(self, shared: Optional[RedisTokenBucket] = None):
+        self.local = LocalTokenBucket()
+        self.shared = shared
+
+    async def check(self, key: str, rule: Optional[RateLimitRule]) -> None:
+        """`rule` None = limite desligado."""
+        if rule is None:
+            return
+        retry_after = self.local.consume(key, rule)
+        if retry_after is None and self.shared is not None:
+            retry_after = await self.shared.consume(key, rule)
+        if retry_after is not None:
+            raise RateLimitExceeded(key, retry_after)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _rule_per_minute_from_env(name: str, default: int) -> Optional[RateLimitRule]:
+    """Limite por minuto do env; <= 0 desliga (None)."""
+    n = _env_int(name, default)
+    if n <= 0:
+        logger.warning("%s=%d — limite desligado", name, n)
+        return None
+    return RateLimitRule.per_minute(n)
+
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1").strip() != "0"
+USER_RULE = _rule_per_minute_from_env("RATE_LIMIT_USER_PER_MINUTE", 10)
+IP_RULE = _rule_per_minute_from_env("RATE_LIMIT_IP_PER_MINUTE", 30)
+
+_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limiter do processo (lazy: o cliente Redis só é criado no primeiro uso)."""
+    global _limiter
+    if _limiter is None:
+        shared = None
+        redis_url = os.getenv("RATE_LIMIT_REDIS_URL", "").strip()
+        if redis_url:
+            try:
+                shared = RedisTokenBucket(redis_url)
+            except ImportError:
+                logger.warning("RATE_LIMIT_REDIS_URL definido mas pacote `redis` ausente; só backend local")
+        _limiter = RateLimiter(shared)
+    return _limiter
+
+
+# Quantos proxies confiáveis anexam ao X-Forwarded-For. Cloud Run direto = 1
+# (o GFE anexa o IP real no fim); atrás de HTTPS LB externo = 2. Os itens à
+# esquerda vêm do cliente e podem ser forjados.
+_TRUSTED_PROXY_HOPS = max(1, _env_int("RATE_LIMIT_TRUSTED_PROXY_HOPS", 1))
+
+
+def client_ip(headers, fallback: Optional[str]) -> str:
+    """IP do cliente a partir do X-Forwarded-For (ou do peer, se ausente)."""
+    forwarded = headers.get("x-forwarded-for")
+    if forwarded:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if hops:
+            return hops[-min(_TRUSTED_PROXY_HOPS, len(hops))]
+    return fallback or "unknown"
@@ -0,0 +1,42 @@
+"""Serialização JSON rápida das respostas da API.
+
+O caminho padrão do FastAPI para um endpoint com `response_model` é:
+`model_dump()` → revalida contra o `response_model` → `jsonable_encoder` →
+`json.dumps`. Para agências com centenas de contas isso custa milissegundos
+de CPU por resposta, tudo sobre dados que nós mesmos acabamos de montar.
+
+`FastJSONResponse` pula essa cadeia: devolvida direto pelo endpoint, o
+FastAPI não revalida nada; modelos Pydantic são serializados pelo
+serializer em Rust do pydantic-core e dicts/listas pelo orjson. Sem orjson
+instalado, cai no `json` da stdlib (mesmo formato de saída).
+
+Os responses montados a partir do Firestore (`routes.auth._callback_response`)
+fazem um único `model_validate` sobre dicts — validação toda no pydantic-core,
+mais barata que `model_construct` conta a conta no Pydantic 2.5.
+
+Benchmark: `python -m scripts.bench_serialization`.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está no requirements.txt
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que aceita modelo Pydantic ou dict e serializa sem revalidar."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return pydantic_core.to_json(content)
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
@@ -9,6 +9,8 @@ from firebase_admin import credentials, auth
 from google.cloud import secretmanager
 import os
 
+from core.deadline import DeadlineExceeded, rpc_timeout
+
 logger = logging.getLogger(__name__)
 
 # Inicializar Firebase Admin SDK
@@ -55,7 +57,10 @@ async def verify_firebase_token(authorization: str) -> str:
         if not user_uid:
             raise ValueError("Token não contém user_uid")
         
-        logger.info(f"✅ Token Firebase validado para user_uid: {user_uid} (tipo: {type(user_uid)}, len: {len(user_uid) if user_uid else 0})")
+        logger.info(
+            "Token Firebase validado user_uid=%s", user_uid,
+            extra={"event": "auth.token_verified", "user_uid": user_uid},
+        )
         return user_uid
         
     except auth.InvalidIdTokenError as e:
@@ -66,6 +71,17 @@ async def verify_firebase_token(authorization: str) -> str:
         raise ValueError(f"Erro ao validar token: {e}")
 
 
+# UIDs Firebase com acesso aos endpoints /admin (CSV). Vazio = ninguém.
+ADMIN_USER_UIDS = frozenset(
+    uid.strip() for uid in os.getenv("ADMIN_USER_UIDS", "").split(",") if uid.strip()
+)
+
+
+def is_admin_uid(user_uid: str) -> bool:
+    """True se o usuário (já autenticado) é admin (env ADMIN_USER_UIDS)."""
+    return user_uid in ADMIN_USER_UIDS
+
+
 def get_secret_manager_client():
     """Retorna cliente do Secret Manager"""
     return secretmanager.SecretManagerServiceClient()
@@ -120,7 +136,12 @@ async def save_access_token(api_key: str, access_token: str):
         # Verifica se o secret já existe
         parent = f"projects/{project_id}"
         try:
-            client.get_secret(request={"name": f"{parent}/secrets/{secret_id}"})
+            client.get_secret(
+                request={"name": f"{parent}/secrets/{secret_id}"},
+                timeout=rpc_timeout("secret_manager"),
+            )
+        except DeadlineExceeded:
+            raise
         except Exception:
             # Cria o secret se não existir
             client.create_secret(
@@ -128,7 +149,8 @@ async def save_access_token(api_key: str, access_token: str):
                     "parent": parent,
                     "secret_id": secret_id,
                     "secret": {"replication": {"automatic": {}}},
-                }
+                },
+                timeout=rpc_timeout("secret_manager"),
             )
         
         # Adiciona nova versão do secret
@@ -136,11 +158,59 @@ async def save_access_token(api_key: str, access_token: str):
             request={
                 "parent": f"{parent}/secrets/{secret_id}",
                 "payload": {"data": access_token.encode("UTF-8")},
-            }
+            },
+            timeout=rpc_timeout("secret_manager"),
         )
         
         logger.info(f"Token salvo no Secret Manager para api_key: {api_key}")
+    except DeadlineExceeded:
+        # Orçamento da request esgotado (core.deadline): 504, não erro de secret.
+        raise
     except Exception as e:
         logger.error(f"Erro ao salvar token no Secret Manager: {e}")
         raise ValueError(f"Erro ao salvar token: {e}")
 
+
+def read_access_token(api_key: str, client=None) -> str:
+    """
+    Lê o access token (última versão) salvo por save_access_token
+
+    Args:
+        api_key: API key da conta (nome do secret)
+        client: SecretManagerServiceClient para reusar (jobs em lote)
+
+    Returns:
+        access_token: Token de acesso do Meta
+    """
+    client = client or get_secret_manager_client()
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "proof-social-ai")
+    name = f"projects/{project_id}/secrets/{api_key}/versions/latest"
+    response = client.access_secret_version(request={"name": name})
+    return response.payload.data.decode("UTF-8")
+
+
+def revoke_access_token(api_key: str, *, destroy: bool = False, client=None) -> int:
+    """
+    Desabilita (ou destrói) todas as versões ativas do secret de uma api_key
+
+    Args:
+        api_key: API key da conta (nome do secret)
+        destroy: True destrói as versões (irreversível); False só desabilita
+        client: SecretManagerServiceClient para reusar (jobs em lote)
+
+    Returns:
+        Quantidade de versões alteradas
+    """
+    client = client or get_secret_manager_client()
+    project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "proof-social-ai")
+    parent = f"projects/{project_id}/secrets/{api_key}"
+    state_filter = "state:ENABLED" if not destroy else "NOT state:DESTROYED"
+
+    changed = 0
+    for version in client.list_secret_versions(request={"parent": parent, "filter": state_filter}):
+        if destroy:
+            client.destroy_secret_version(request={"name": version.name})
+        else:
+            client.disable_secret_version(request={"name": version.name})
+        changed += 1
+    return changed
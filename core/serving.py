@@ -0,0 +1,14 @@
+"""Worker uvicorn para o modo multi-processo (gunicorn).
+
+O `UvicornWorker` padrão usa `loop="auto"`/`http="auto"` e cai silenciosamente
+para asyncio/h11 se uvloop/httptools não estiverem instalados. Aqui fixamos os
+dois: se faltarem, o worker falha no boot em vez de rodar mais lento.
+"""
+
+from __future__ import annotations
+
+from uvicorn.workers import UvicornWorker
+
+
+class UvloopWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
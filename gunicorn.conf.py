@@ -0,0 +1,35 @@
+"""Configuração gunicorn — modo de produção multi-processo.
+
+Uso: gunicorn -c gunicorn.conf.py main:app
+
+Envs:
+- PORT: porta (Cloud Run injeta; default 8080).
+- WEB_CONCURRENCY: nº de workers (default 2 — Cloud Run com 1 vCPU; as chamadas
+  bloqueantes a Firestore/Secret Manager/Firebase travam o event loop, então
+  >1 worker por vCPU ainda rende).
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER: recicla o worker após N
+  requests (limita crescimento de memória). 0 desliga.
+- GUNICORN_TIMEOUT: segundos sem heartbeat antes de matar o worker (default 60,
+  igual ao --timeout do Cloud Run).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "core.serving.UvloopWorker"
+
+# App importado uma vez no master e herdado pelos workers via fork: boot e
+# reciclagem mais rápidos. Nada de gRPC/rede no import (clientes Google são
+# criados sob demanda) — fork depois de abrir canal gRPC não é seguro.
+preload_app = True
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 75  # > idle timeout do front-end do Cloud Run/LB
+
+accesslog = None
+errorlog = "-"
@@ -3,46 +3,122 @@ Proof Social - Instagram OAuth API
 API para autenticação OAuth com Meta/Instagram.
 """
 
+import asyncio
 import logging
 import os
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI, Request
 
-from routes import auth
+from core.logging_config import setup_logging, shutdown_logging
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
-logger = logging.getLogger(__name__)
+# Antes dos demais imports de core/routes: core.security (importado por
+# core.meta_webhooks e pelas rotas) loga na inicialização do Firebase.
+setup_logging()
 
+from core.callback_jobs import callback_jobs  # noqa: E402
+from core.concurrency import OverloadedError  # noqa: E402
+from core.cors import OriginMatcherCORSMiddleware, max_age_from_env, origins_from_env  # noqa: E402
+from core.deadline import DEADLINE_HEADER, DeadlineExceeded  # noqa: E402
+from core.events import event_log  # noqa: E402
+from core.instagram_config import get_instagram_config  # noqa: E402
+from core.meta_webhooks import deauth_queue  # noqa: E402
+from core.profiling import ProfilingMiddleware, profiling_enabled  # noqa: E402
+from core.responses import FastJSONResponse  # noqa: E402
+from routes import admin, auth  # noqa: E402
 
-def _allowed_origins() -> list[str]:
-    """CSV de origens permitidas via env. Vazio = bloqueio."""
-    raw = os.getenv("ALLOWED_CORS_ORIGINS", "").strip()
-    if not raw:
-        logger.warning(
-            "ALLOWED_CORS_ORIGINS vazio — CORS bloqueia origens externas. "
-            "Definir em produção."
-        )
-        return []
-    return [origin.strip() for origin in raw.split(",") if origin.strip()]
+logger = logging.getLogger(__name__)
 
 
 app = FastAPI(
     title="Proof Social Instagram Auth API",
     description="API para autenticação OAuth com Meta/Instagram",
     version="1.1.0",
+    # orjson nos endpoints que devolvem dict; os de hot path já retornam
+    # FastJSONResponse direto (sem revalidação do response_model).
+    default_response_class=FastJSONResponse,
 )
 
-# CORS restritivo. Sem allow_origins=["*"]: aceita explicitamente origens conhecidas.
+# CORS restritivo. Sem allow_origins=["*"]: origens exatas ou padrões por
+# rótulo (preview deploys), compilados uma vez (core.cors). Preflight em cache
+# no navegador por CORS_MAX_AGE.
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=_allowed_origins(),
+    OriginMatcherCORSMiddleware,
+    origins=origins_from_env(),
     allow_credentials=False,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match", DEADLINE_HEADER],
+    # ETag: o frontend reenvia em If-None-Match (GET /auth/instagram/accounts).
+    expose_headers=["ETag", "Retry-After"],
+    max_age=max_age_from_env(),
 )
 
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+
+# Profiling por amostragem (core.profiling): só instalado se configurado.
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+
+
+@app.exception_handler(OverloadedError)
+async def _overloaded(request: Request, exc: OverloadedError):
+    """Limitador de chamadas à Meta saturado (core.concurrency): 503 + Retry-After."""
+    return FastJSONResponse(
+        {"detail": exc.detail},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def _deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    """Orçamento da request esgotado (core.deadline): 504, sem retries pendurados."""
+    logger.warning(
+        "Deadline esgotado em %s %s (etapa=%s)", request.method, request.url.path, exc.stage or "?",
+        extra={"event": "deadline.exceeded", "stage": exc.stage},
+    )
+    return FastJSONResponse({"detail": exc.detail}, status_code=504)
+
+
+@app.on_event("startup")
+async def _warm_config_cache():
+    """Pré-carrega o cache de credenciais IG em cada worker (o startup roda
+    por processo, depois do fork — nunca no master do gunicorn)."""
+    try:
+        await asyncio.to_thread(get_instagram_config)
+    except Exception as e:
+        logger.warning("Cache de config Instagram não aquecido no startup: %s", e)
+
+
+@app.on_event("startup")
+async def _start_deauth_worker():
+    deauth_queue.start()
+
+
+@app.on_event("startup")
+async def _start_event_log():
+    event_log.start()
+
+
+@app.on_event("shutdown")
+async def _drain_deauth_queue():
+    await deauth_queue.stop()
+
+
+@app.on_event("shutdown")
+async def _drain_callback_jobs():
+    await callback_jobs.drain()
+
+
+@app.on_event("shutdown")
+async def _flush_event_log():
+    # Depois dos jobs de callback: eles ainda emitem eventos.
+    await event_log.stop()
+
+
+@app.on_event("shutdown")
+async def _flush_logs():
+    shutdown_logging()
 
 
 @app.get("/")
@@ -0,0 +1,108 @@
+"""Endpoints administrativos (Firebase token + user_uid em ADMIN_USER_UIDS)."""
+
+from __future__ import annotations
+
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from google.cloud import firestore
+
+from core.disconnect import DisconnectTarget, disconnect
+from core.firestore_scan import DEFAULT_PAGE_SIZE
+from core.integrations_export import InvalidFieldsError, iter_ndjson, parse_fields
+from core.profiling import profile_store, profiling_enabled, render
+from core.responses import FastJSONResponse
+from core.security import is_admin_uid
+from routes.auth import get_user_uid
+from schemas.instagram import AdminDisconnectRequest, InstagramDisconnectResponse
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+async def require_admin(user_uid: str = Depends(get_user_uid)) -> str:
+    if not is_admin_uid(user_uid):
+        logger.warning("Acesso admin negado user_uid=%s", user_uid, extra={"event": "admin.denied"})
+        raise HTTPException(status_code=403, detail="Acesso restrito a administradores")
+    return user_uid
+
+
+@router.get("/profiles")
+async def list_profiles(_admin: str = Depends(require_admin)):
+    """Profiles capturados neste processo (mais recente primeiro).
+
+    Com vários workers/instâncias cada processo tem seu anel: repetir a chamada
+    pode cair em outro processo.
+    """
+    return FastJSONResponse({"enabled": profiling_enabled(), "profiles": profile_store.list()})
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("text", pattern="^(text|html|speedscope)$"),
+    _admin: str = Depends(require_admin),
+):
+    """Profile renderizado: `text` (árvore), `html` (pyinstrument) ou `speedscope` (JSON)."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile não encontrado neste processo")
+    content, media_type = render(profile, format)
+    return Response(content=content, media_type=media_type)
+
+
+@router.delete("/profiles")
+async def clear_profiles(_admin: str = Depends(require_admin)):
+    profile_store.clear()
+    return FastJSONResponse({"status": "cleared"})
+
+
+@router.post("/integrations/disconnect", response_model=InstagramDisconnectResponse)
+async def disconnect_integrations(request: AdminDisconnectRequest, admin_uid: str = Depends(require_admin)):
+    """Desconexão em lote: contas de muitos usuários (sem `account_ids` = todas).
+
+    Remoções e revogações em paralelo limitado (core.disconnect); falhas
+    parciais em `failures`, o resto é aplicado.
+    """
+    # Um alvo por usuário: duas transações no mesmo doc só disputariam entre si.
+    merged: dict[str, set[str] | None] = {}
+    for target in request.targets:
+        ids = None if target.account_ids is None else set(target.account_ids)
+        if target.user_uid in merged:
+            current = merged[target.user_uid]
+            ids = None if current is None or ids is None else current | ids
+        merged[target.user_uid] = ids
+    targets = [
+        DisconnectTarget(user_uid=uid, account_ids=None if ids is None else frozenset(ids))
+        for uid, ids in merged.items()
+    ]
+    logger.info(
+        "Desconexão em lote por admin=%s: %d usuários (destroy=%s)", admin_uid, len(targets), request.destroy_secrets,
+        extra={"event": "admin.disconnect", "users": len(targets)},
+    )
+    report = await disconnect(targets, destroy=request.destroy_secrets)
+    return FastJSONResponse(InstagramDisconnectResponse.model_validate(report.to_dict()))
+
+
+@router.get("/integrations/export")
+async def export_integrations(
+    fields: str = Query("", description="Projeção CSV, ex.: user_uid,status,accounts.username"),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    admin_uid: str = Depends(require_admin),
+):
+    """Dump NDJSON de `integrations` sem tokens/api_keys (core.integrations_export).
+
+    Stream paginado: memória constante no servidor, uma linha por integração.
+    """
+    try:
+        parse_fields(fields)
+    except InvalidFieldsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info("Export de integrações por admin=%s fields=%s", admin_uid, fields or "*",
+                extra={"event": "admin.export"})
+    return StreamingResponse(
+        iter_ndjson(firestore.Client(), fields=fields, page_size=page_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="integrations.ndjson"'},
+    )
@@ -17,24 +17,54 @@ Doc: https://developers.facebook.com/docs/instagram-platform/instagram-api-with-
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import json
 import logging
+import os
 import uuid
-from collections import defaultdict
-from typing import Optional
-from urllib.parse import urlencode
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qs, urlencode
 
 import httpx
-from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 from google.cloud import firestore
 
+from core import deadline
+from core.accounts_cache import accounts_cache, etag_matches
+from core.accounts_store import has_account, load_accounts, upsert_account
+from core.callback_jobs import STATUS_ERROR, STATUS_PENDING, callback_jobs
+from core import events
+from core.concurrency import meta_limiter
+from core.deadline import DEADLINE_HEADER, DeadlineExceeded
+from core.disconnect import DisconnectTarget, disconnect
+from core.ineligible_accounts import ineligible_accounts
 from core.instagram_config import get_instagram_config
+from core.meta_webhooks import (
+    DATA_DELETION_COLLECTION,
+    KIND_DATA_DELETION,
+    KIND_DEAUTHORIZE,
+    DeauthJob,
+    InvalidSignedRequestError,
+    deauth_queue,
+    parse_signed_request,
+)
+from core.rate_limit import (
+    IP_RULE,
+    RATE_LIMIT_ENABLED,
+    USER_RULE,
+    RateLimitExceeded,
+    client_ip,
+    get_rate_limiter,
+)
+from core.responses import FastJSONResponse
 from core.security import save_access_token, verify_firebase_token
 from core.state import generate_state, validate_state, InvalidStateError
 from schemas.instagram import (
-    InstagramAccount,
+    InstagramCallbackJobResponse,
     InstagramCallbackRequest,
     InstagramCallbackResponse,
+    InstagramDisconnectRequest,
+    InstagramDisconnectResponse,
     InstagramLoginRequest,
     InstagramLoginResponse,
 )
@@ -42,8 +72,39 @@ from schemas.instagram import (
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+
+class _KeyedLocks:
+    """asyncio.Lock por chave, descartado quando o último usuário sai.
+
+    O `defaultdict(asyncio.Lock)` antigo nunca removia entradas: crescia 1 lock
+    por callback para sempre. Escopo é o processo — com vários workers/instâncias
+    o code duplicado é barrado pela própria Meta (code de uso único → ramo
+    "has been used" em _exchange_code_for_short_token).
+    """
+
+    def __init__(self):
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @contextlib.asynccontextmanager
+    async def hold(self, key: str):
+        lock, users = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+
 # Lock por código pra evitar processar o mesmo code 2x (React Strict Mode).
-processing_codes: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+processing_codes = _KeyedLocks()
 
 # Scopes do Instagram Login API. Cobertura para o que o Proof precisa:
 # - basic: id, username, account_type
@@ -75,10 +136,57 @@ async def get_user_uid(authorization: Optional[str] = Header(None)) -> str:
         raise HTTPException(status_code=401, detail=f"Token inválido: {e}")
 
 
-@router.post("/instagram/login", response_model=InstagramLoginResponse)
+def _too_many_requests(exc: RateLimitExceeded, scope: str) -> HTTPException:
+    logger.warning(
+        "Rate limit excedido scope=%s key=%s retry_after=%ds", scope, exc.key, exc.retry_after,
+        extra={"event": "ratelimit.rejected", "scope": scope, "retry_after": exc.retry_after},
+    )
+    return HTTPException(
+        status_code=429,
+        detail="Muitas requisições. Tente novamente em instantes.",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _ip_rate_limit(scope: str):
+    """Dependency: limita por IP do cliente. Roda ANTES da validação do token
+    Firebase (usada em `dependencies=[...]` da rota)."""
+
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        peer = request.client.host if request.client else None
+        ip = client_ip(request.headers, peer)
+        try:
+            await get_rate_limiter().check(f"{scope}:ip:{ip}", IP_RULE)
+        except RateLimitExceeded as e:
+            raise _too_many_requests(e, scope)
+
+    return dependency
+
+
+def _user_rate_limit(scope: str):
+    """Dependency: autentica (get_user_uid) e limita por user_uid. Retorna o uid."""
+
+    async def dependency(user_uid: str = Depends(get_user_uid)) -> str:
+        if RATE_LIMIT_ENABLED:
+            try:
+                await get_rate_limiter().check(f"{scope}:user:{user_uid}", USER_RULE)
+            except RateLimitExceeded as e:
+                raise _too_many_requests(e, scope)
+        return user_uid
+
+    return dependency
+
+
+@router.post(
+    "/instagram/login",
+    response_model=InstagramLoginResponse,
+    dependencies=[Depends(_ip_rate_limit("login"))],
+)
 async def instagram_login(
     request: InstagramLoginRequest,
-    user_uid: str = Depends(get_user_uid),
+    user_uid: str = Depends(_user_rate_limit("login")),
 ):
     """Gera URL de autorização Instagram Login API.
 
@@ -120,7 +228,7 @@ async def instagram_login(
             "Instagram OAuth URL gerada user_uid=%s redirect_uri=%s",
             user_uid, request.redirect_uri,
         )
-        return InstagramLoginResponse(auth_url=auth_url)
+        return FastJSONResponse(InstagramLoginResponse(auth_url=auth_url))
     except HTTPException:
         raise
     except Exception as e:
@@ -128,15 +236,37 @@ async def instagram_login(
         raise HTTPException(status_code=500, detail=f"Erro: {str(e)}")
 
 
-@router.post("/instagram/process-callback", response_model=InstagramCallbackResponse)
+@router.post(
+    "/instagram/process-callback",
+    response_model=InstagramCallbackResponse,
+    dependencies=[Depends(_ip_rate_limit("callback"))],
+)
 async def instagram_process_callback(
     request: InstagramCallbackRequest,
-    user_uid: str = Depends(get_user_uid),
+    user_uid: str = Depends(_user_rate_limit("callback")),
+    x_request_deadline_ms: Optional[str] = Header(None, alias=DEADLINE_HEADER),
 ):
     """Processa callback OAuth Instagram Login API e configura integração.
 
-    Body: {"code": "...", "state": "...", "redirect_uri": "..."}
+    Body: {"code": "...", "state": "...", "redirect_uri": "...", "async_mode": false}
+
+    Com `async_mode=true`: responde 202 {job_id, status, status_url} logo após a
+    troca do code; o resultado sai em GET /instagram/process-callback/jobs/{job_id}.
+
+    Deadline: header `X-Request-Deadline-Ms` (orçamento do cliente) ou
+    CALLBACK_DEADLINE_S; estourado → 504 (core.deadline).
     """
+    with deadline.deadline_scope(deadline.budget_from_header(x_request_deadline_ms)), \
+            events.bound(user_uid=user_uid):
+        return await _process_callback(request, user_uid)
+
+
+async def _process_callback(request: InstagramCallbackRequest, user_uid: str):
+    # Meta lenta e fila do limitador cheia: recusa já, antes de gastar
+    # Firestore e o code (que o usuário pode reaproveitar no retry).
+    if meta_limiter.saturated():
+        raise meta_limiter.reject("fila cheia na entrada do callback")
+
     # Limpa fragmento `#_=_` que Meta às vezes adiciona.
     cleaned_state = (request.state or "").split("#")[0].rstrip("_=").strip()
 
@@ -148,167 +278,383 @@ async def instagram_process_callback(
 
     db = firestore.Client()
     integration_ref = db.collection("integrations").document(user_uid)
-    existing = integration_ref.get()
 
     config = get_instagram_config()
     app_id = config["app_id"]
     app_secret = config["app_secret"]
 
     code_key = f"{user_uid}:{request.code}"
-    async with processing_codes[code_key]:
+    async with processing_codes.hold(code_key):
+        # Lido DENTRO do lock: a 2ª request com o mesmo code enxerga o que a 1ª gravou.
+        existing = integration_ref.get(timeout=deadline.rpc_timeout("firestore"))
         async with httpx.AsyncClient(timeout=30.0) as client:
-            short_token, ig_user_id = await _exchange_code_for_short_token(
+            short_token, ig_user_id, permissions = await _exchange_code_for_short_token(
                 client, app_id, app_secret, request.code, request.redirect_uri,
                 existing_doc=existing,
             )
 
-            try:
-                long_token, expires_in = await _exchange_short_for_long_token(
-                    client, app_secret, short_token,
-                )
-            except HTTPException as exch_err:
-                # "Unsupported request - method type: get" (code 100) na troca long-lived
-                # NÃO é transitório: é a assinatura de conta NÃO-ELEGÍVEL. O token devolvido
-                # não é um token da Instagram Graph API — o próprio graph.instagram.com
-                # rejeita QUALQUER GET com ele (inclusive /me), então nem dá pra ler o
-                # account_type. Acontece quando a conta IG não é Profissional (Comercial/
-                # Criador). Detectamos pela assinatura do erro e damos mensagem acionável.
-                detail_str = str(exch_err.detail or "")
-                inelegivel = (
-                    "unsupported request" in detail_str.lower()
-                    or "method type: get" in detail_str.lower()
-                )
-                # Best-effort: tenta o username/tipo (geralmente também falha p/ conta inelegível).
-                uname, acc_type = "", ""
-                try:
-                    diag = await _fetch_instagram_profile(client, short_token)
-                    uname = diag.get("username") or ""
-                    acc_type = str(diag.get("account_type") or "").upper()
-                except Exception:
-                    pass
-                logger.error(
-                    "short→long FALHOU user_uid=%s conta=@%s account_type=%s inelegivel=%s :: %s",
-                    user_uid, uname or "?", acc_type or "DESCONHECIDO", inelegivel, detail_str,
-                )
-                if inelegivel or (acc_type and acc_type not in ("BUSINESS", "MEDIA_CREATOR", "CREATOR")):
-                    conta = f"@{uname} " if uname else ""
-                    raise HTTPException(
-                        status_code=400,
-                        detail=(
-                            f"Não foi possível conectar a conta {conta}do Instagram. Em geral isso "
-                            "acontece quando ela NÃO é uma conta Profissional. No app do Instagram: "
-                            "Configurações → Tipo e ferramentas de conta → mude para Profissional "
-                            "(Comercial ou Criador de conteúdo) e tente conectar de novo."
-                        ),
-                    )
-                raise exch_err
-
-            profile = await _fetch_instagram_profile(client, long_token)
-
-        new_account_id = str(profile.get("id") or ig_user_id)
-        new_account_username = profile.get("username") or ""
-
-        # Idempotência: se já existe doc COM ESSA MESMA conta criada há < 5min,
-        # retorna sem fazer nada. Proteção contra React Strict Mode em dev OU
-        # double-click no botão. Não atrapalha multi-conta porque compara id.
-        if existing.exists:
-            data = existing.to_dict() or {}
-            created_at = data.get("created_at")
-            already_has_this = any(
-                str(a.get("id")) == new_account_id
-                for a in (data.get("instagram_accounts") or [])
-            )
-            if (
-                already_has_this
-                and isinstance(created_at, _dt_module().datetime)
-                and (_dt_module().datetime.now(_dt_module().timezone.utc) - created_at).total_seconds() < 300
-            ):
-                logger.info(
-                    "Reconexão dedupe user_uid=%s ig_id=%s — retornando estado atual",
-                    user_uid, new_account_id,
+            if not request.async_mode:
+                return FastJSONResponse(await _complete_callback(
+                    client,
+                    db=db,
+                    integration_ref=integration_ref,
+                    existing=existing,
+                    user_uid=user_uid,
+                    app_secret=app_secret,
+                    short_token=short_token,
+                    ig_user_id=ig_user_id,
+                    permissions=permissions,
+                ))
+
+    # Modo assíncrono: o code já foi trocado (não expira mais); o resto vai pro fundo.
+    async def _work() -> dict:
+        # Orçamento próprio: a task herdaria o deadline da request que já respondeu.
+        with deadline.deadline_scope(deadline.CALLBACK_JOB_DEADLINE_S):
+            async with httpx.AsyncClient(timeout=30.0) as bg_client:
+                response = await _complete_callback(
+                    bg_client,
+                    db=db,
+                    integration_ref=integration_ref,
+                    existing=existing,
+                    user_uid=user_uid,
+                    app_secret=app_secret,
+                    short_token=short_token,
+                    ig_user_id=ig_user_id,
+                    permissions=permissions,
                 )
-                return _build_response_from_doc(data, message="Integração já configurada.")
-
-        api_key = str(uuid.uuid4())
-        await save_access_token(api_key, long_token)
-
-        # Monta o objeto da nova conta a partir do profile do IG.
-        new_account_doc = {
-            "id": new_account_id,
-            "username": new_account_username,
-            "name": profile.get("name") or new_account_username or "",
-            "account_type": profile.get("account_type", "BUSINESS"),
-            "followers_count": profile.get("followers_count", 0),
-            "media_count": profile.get("media_count", 0),
-            "profile_picture_url": profile.get("profile_picture_url") or "",
-            "active": True,
-            # Token por conta: cada conta IG tem seu próprio long-lived token.
-            # api_key aponta pra esse token específico em secret/storage.
-            "api_key": api_key,
-            "token_expires_in_seconds": expires_in,
-        }
+        return response.model_dump()
 
-        # MERGE: se já existe doc, preserva as outras contas. Adiciona/atualiza
-        # a conta nova pelo id. Caso seja primeira conexão, cria do zero.
-        if existing.exists:
-            data = existing.to_dict() or {}
-            existing_accounts = data.get("instagram_accounts") or []
-            # Substitui se já existe (refresh de token), senão append.
-            merged = [a for a in existing_accounts if str(a.get("id")) != new_account_id]
-            merged.append(new_account_doc)
-
-            integration_ref.update({
-                "instagram_accounts": merged,
-                # api_key root do doc fica apontando pra última conta conectada
-                # (compat com código legado que lê integration.api_key direto).
-                # Code novo deve preferir account.api_key.
-                "api_key": api_key,
-                "status": "active",
-                "updated_at": firestore.SERVER_TIMESTAMP,
-                "token_expires_in_seconds": expires_in,
-            })
-            logger.info(
-                "Instagram account adicionada (merge) user_uid=%s ig_id=%s @%s total_accounts=%d",
-                user_uid, new_account_id, new_account_username, len(merged),
+    job_id = callback_jobs.create(db, user_uid)
+    callback_jobs.spawn(db, job_id, _work())
+    logger.info(
+        "Callback async aceito user_uid=%s job_id=%s ig_user_id=%s", user_uid, job_id, ig_user_id,
+        extra={"event": "callback.async_accepted", "job_id": job_id},
+    )
+    job = InstagramCallbackJobResponse(
+        job_id=job_id,
+        status=STATUS_PENDING,
+        status_url=f"/auth/instagram/process-callback/jobs/{job_id}",
+    )
+    return FastJSONResponse(job, status_code=202)
+
+
+@router.get(
+    "/instagram/process-callback/jobs/{job_id}",
+    response_model=InstagramCallbackResponse,
+    responses={202: {"model": InstagramCallbackJobResponse}},
+)
+async def instagram_process_callback_job(
+    job_id: str,
+    wait: float = Query(0.0, ge=0.0, le=25.0, description="Long-poll: segundos para esperar a conclusão"),
+    user_uid: str = Depends(get_user_uid),
+):
+    """Status do callback assíncrono.
+
+    - pendente: 202 {job_id, status: "pending", status_url}
+    - sucesso: 200 com o mesmo InstagramCallbackResponse do modo síncrono
+    - erro: o mesmo status/detail que o modo síncrono devolveria
+    """
+    job = await callback_jobs.get(firestore.Client(), job_id, wait_s=wait)
+    if job is None or job.get("user_uid") != user_uid:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    status = job.get("status")
+    if status == STATUS_PENDING:
+        pending = InstagramCallbackJobResponse(
+            job_id=job_id,
+            status=STATUS_PENDING,
+            status_url=f"/auth/instagram/process-callback/jobs/{job_id}",
+        )
+        return FastJSONResponse(pending, status_code=202)
+    if status == STATUS_ERROR:
+        raise HTTPException(status_code=int(job.get("status_code") or 500), detail=job.get("error"))
+    # `result` é o model_dump() do próprio InstagramCallbackResponse: sai como está.
+    return FastJSONResponse(job.get("result") or {})
+
+
+@router.get(
+    "/instagram/accounts",
+    response_model=InstagramCallbackResponse,
+    responses={304: {"description": "Lista inalterada desde o ETag enviado em If-None-Match"}},
+)
+async def instagram_accounts(
+    user_uid: str = Depends(get_user_uid),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Contas Instagram ativas do usuário, no mesmo formato do process-callback.
+
+    Corpo em cache por usuário (core.accounts_cache), validado pelo
+    update_time do doc raiz: no acerto custa 1 leitura pequena do Firestore.
+    ETag forte; com `If-None-Match` igual responde 304 sem corpo.
+    """
+    integration_ref = firestore.Client().collection("integrations").document(user_uid)
+    snap = await asyncio.to_thread(integration_ref.get)
+    if not snap.exists:
+        raise HTTPException(status_code=404, detail="Nenhuma integração Instagram encontrada")
+
+    entry = accounts_cache.get(user_uid, snap.update_time)
+    if entry is None:
+        data = snap.to_dict() or {}
+        accounts = await asyncio.to_thread(load_accounts, integration_ref, data)
+        response = _build_response_from_doc(
+            data,
+            message="Contas Instagram conectadas",
+            accounts=[a for a in accounts if a.get("active", True)],
+        )
+        entry = accounts_cache.put(user_uid, snap.update_time, FastJSONResponse(response).body)
+
+    # no-cache: o navegador pode guardar, mas revalida sempre (If-None-Match → 304).
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+@router.post("/instagram/disconnect", response_model=InstagramDisconnectResponse)
+async def instagram_disconnect(
+    request: InstagramDisconnectRequest,
+    user_uid: str = Depends(_user_rate_limit("disconnect")),
+):
+    """Desconecta contas do usuário: remove da integração e desabilita os secrets.
+
+    `status: "partial"` lista em `failures` o que não saiu (conta inexistente,
+    falha no Secret Manager); o restante foi desconectado.
+    """
+    if not request.all_accounts and not request.account_ids:
+        raise HTTPException(status_code=400, detail="Informe account_ids ou all_accounts=true")
+    target = DisconnectTarget(
+        user_uid=user_uid,
+        account_ids=None if request.all_accounts else frozenset(request.account_ids),
+    )
+    report = await disconnect([target])
+    return FastJSONResponse(InstagramDisconnectResponse.model_validate(report.to_dict()))
+
+
+async def _complete_callback(
+    client: httpx.AsyncClient,
+    *,
+    db,
+    integration_ref,
+    existing,
+    user_uid: str,
+    app_secret: str,
+    short_token: str,
+    ig_user_id: str,
+    permissions: Optional[frozenset[str]] = None,
+) -> InstagramCallbackResponse:
+    """Etapas após code→short: short→long, /me, dedupe, secret e merge no Firestore."""
+    # Conta já vista como inelegível (ou sem o escopo business): o "Unsupported
+    # request" do short→long é conclusivo — sem retries nem /me de diagnóstico.
+    suspect = _likely_ineligible(ig_user_id, permissions)
+    try:
+        long_token, expires_in = await _exchange_short_for_long_token(
+            client, app_secret, short_token, retry_unsupported=suspect is None,
+        )
+    except HTTPException as exch_err:
+        # "Unsupported request - method type: get" (code 100) na troca long-lived
+        # NÃO é transitório: é a assinatura de conta NÃO-ELEGÍVEL. O token devolvido
+        # não é um token da Instagram Graph API — o próprio graph.instagram.com
+        # rejeita QUALQUER GET com ele (inclusive /me), então nem dá pra ler o
+        # account_type. Acontece quando a conta IG não é Profissional (Comercial/
+        # Criador). Detectamos pela assinatura do erro e damos mensagem acionável.
+        detail_str = str(exch_err.detail or "")
+        inelegivel = (
+            "unsupported request" in detail_str.lower()
+            or "method type: get" in detail_str.lower()
+        )
+        # Best-effort: tenta o username/tipo (geralmente também falha p/ conta inelegível).
+        uname, acc_type = "", ""
+        if not (inelegivel and suspect):
+            try:
+                # Só diagnóstico: code 100 aqui já é a resposta, sem retentar.
+                diag = await _fetch_instagram_profile(client, short_token, retry_unsupported=False)
+                uname = diag.get("username") or ""
+                acc_type = str(diag.get("account_type") or "").upper()
+            except Exception:
+                pass
+        logger.error(
+            "short→long FALHOU user_uid=%s conta=@%s account_type=%s inelegivel=%s suspeita=%s :: %s",
+            user_uid, uname or "?", acc_type or "DESCONHECIDO", inelegivel, suspect or "-", detail_str,
+        )
+        if inelegivel or (acc_type and acc_type not in ("BUSINESS", "MEDIA_CREATOR", "CREATOR")):
+            ineligible_accounts.mark(ig_user_id)
+            events.emit(
+                events.EVENT_INELIGIBLE, ig_user_id=ig_user_id, username=uname or None,
+                reason=acc_type or suspect or ("unsupported_request" if inelegivel else None),
+            )
+            conta = f"@{uname} " if uname else ""
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    f"Não foi possível conectar a conta {conta}do Instagram. Em geral isso "
+                    "acontece quando ela NÃO é uma conta Profissional. No app do Instagram: "
+                    "Configurações → Tipo e ferramentas de conta → mude para Profissional "
+                    "(Comercial ou Criador de conteúdo) e tente conectar de novo."
+                ),
             )
-        else:
-            integration_ref.set({
-                "user_uid": user_uid,
-                "platform": "instagram",
-                "auth_provider": "instagram_login_api",
-                "api_key": api_key,
-                "status": "active",
-                "created_at": firestore.SERVER_TIMESTAMP,
-                "instagram_accounts": [new_account_doc],
-                "token_expires_in_seconds": expires_in,
-            })
+        raise exch_err
+
+    profile = await _fetch_instagram_profile(client, long_token)
+    # Conta passou no short→long: é elegível (pode ter virado Profissional).
+    ineligible_accounts.discard(ig_user_id)
+
+    new_account_id = str(profile.get("id") or ig_user_id)
+    new_account_username = profile.get("username") or ""
+
+    # Idempotência: se já existe doc COM ESSA MESMA conta criada há < 5min,
+    # retorna sem fazer nada. Proteção contra React Strict Mode em dev OU
+    # double-click no botão. Não atrapalha multi-conta porque compara id.
+    if existing.exists:
+        data = existing.to_dict() or {}
+        created_at = data.get("created_at")
+        if (
+            isinstance(created_at, _dt_module().datetime)
+            and (_dt_module().datetime.now(_dt_module().timezone.utc) - created_at).total_seconds() < 300
+            and has_account(integration_ref, data, new_account_id)
+        ):
             logger.info(
-                "Instagram integration criada user_uid=%s ig_id=%s @%s",
-                user_uid, new_account_id, new_account_username,
+                "Reconexão dedupe user_uid=%s ig_id=%s — retornando estado atual",
+                user_uid, new_account_id,
+            )
+            events.emit(events.EVENT_DEDUPE, ig_user_id=new_account_id, username=new_account_username)
+            return _build_response_from_doc(
+                data,
+                message="Integração já configurada.",
+                accounts=load_accounts(integration_ref, data),
             )
 
-        account = InstagramAccount(
-            id=new_account_id,
-            username=new_account_username,
-            name=new_account_username,
+    api_key = str(uuid.uuid4())
+    await save_access_token(api_key, long_token)
+
+    # Monta o objeto da nova conta a partir do profile do IG.
+    new_account_doc = {
+        "id": new_account_id,
+        "username": new_account_username,
+        "name": profile.get("name") or new_account_username or "",
+        "account_type": profile.get("account_type", "BUSINESS"),
+        "followers_count": profile.get("followers_count", 0),
+        "media_count": profile.get("media_count", 0),
+        "profile_picture_url": profile.get("profile_picture_url") or "",
+        "active": True,
+        # Token por conta: cada conta IG tem seu próprio long-lived token.
+        # api_key aponta pra esse token específico em secret/storage.
+        "api_key": api_key,
+        "token_expires_in_seconds": expires_in,
+    }
+
+    # MERGE: se já existe doc, preserva as outras contas. Adiciona/atualiza
+    # a conta nova pelo id (layout array ou subcollection, vide
+    # core.accounts_store). Caso seja primeira conexão, cria do zero.
+    if existing.exists:
+        existing_data = existing.to_dict() or {}
+        previous_total = int(
+            existing_data.get("account_count") or len(existing_data.get("instagram_accounts") or [])
         )
-        # Refetch pra incluir TODAS as contas no response (importante pro
-        # frontend atualizar a lista no appState).
-        final = integration_ref.get().to_dict() or {}
-        all_accounts = [
-            InstagramAccount(
-                id=str(a.get("id")),
-                username=a.get("username"),
-                name=a.get("name") or a.get("username"),
-            )
-            for a in (final.get("instagram_accounts") or [])
-        ]
-        return InstagramCallbackResponse(
-            api_key=api_key,
-            instagram_accounts=all_accounts or [account],
-            message="Integração Instagram configurada com sucesso",
-            status="success",
+        total = upsert_account(db, integration_ref, new_account_doc, {
+            # api_key root do doc fica apontando pra última conta conectada
+            # (compat com código legado que lê integration.api_key direto).
+            # Code novo deve preferir account.api_key.
+            "api_key": api_key,
+            "status": "active",
+            "updated_at": firestore.SERVER_TIMESTAMP,
+            "token_expires_in_seconds": expires_in,
+        })
+        accounts_cache.invalidate(user_uid)
+        logger.info(
+            "Instagram account adicionada (merge) user_uid=%s ig_id=%s @%s total_accounts=%d",
+            user_uid, new_account_id, new_account_username, total,
+        )
+        # Total não cresceu → a conta já estava conectada (renovação de token).
+        events.emit(
+            events.EVENT_CONNECT if total > previous_total else events.EVENT_RECONNECT,
+            ig_user_id=new_account_id, username=new_account_username, account_count=total,
         )
+    else:
+        upsert_account(db, integration_ref, new_account_doc, {
+            "user_uid": user_uid,
+            "platform": "instagram",
+            "auth_provider": "instagram_login_api",
+            "api_key": api_key,
+            "status": "active",
+            "created_at": firestore.SERVER_TIMESTAMP,
+            "token_expires_in_seconds": expires_in,
+        })
+        accounts_cache.invalidate(user_uid)
+        logger.info(
+            "Instagram integration criada user_uid=%s ig_id=%s @%s",
+            user_uid, new_account_id, new_account_username,
+        )
+        events.emit(
+            events.EVENT_CONNECT, ig_user_id=new_account_id, username=new_account_username, account_count=1,
+        )
+
+    # Refetch pra incluir TODAS as contas no response (importante pro
+    # frontend atualizar a lista no appState).
+    final = integration_ref.get(timeout=deadline.rpc_timeout("firestore")).to_dict() or {}
+    accounts = load_accounts(integration_ref, final) or [new_account_doc]
+    return _callback_response(api_key, accounts, message="Integração Instagram configurada com sucesso")
+
+
+# --------------------------------------------------------------------------- #
+# Webhooks Meta: desautorização / exclusão de dados                           #
+# --------------------------------------------------------------------------- #
+
+
+async def _verified_signed_request(request: Request) -> dict:
+    """Lê `signed_request` do form (x-www-form-urlencoded) e valida o HMAC com o
+    app secret em cache. Sem python-multipart: o form é parseado à mão."""
+    body = (await request.body()).decode("utf-8", errors="replace")
+    signed_request = (parse_qs(body).get("signed_request") or [""])[0]
+    if not signed_request:
+        raise HTTPException(status_code=400, detail="signed_request ausente")
+    try:
+        return parse_signed_request(signed_request, get_instagram_config()["app_secret"])
+    except InvalidSignedRequestError as e:
+        logger.warning("signed_request inválido: %s", e, extra={"event": "deauth.invalid_signature"})
+        raise HTTPException(status_code=400, detail="signed_request inválido")
+
+
+@router.post("/instagram/deauthorize")
+async def instagram_deauthorize(request: Request):
+    """Deauthorize Callback URL (Meta). Responde na hora; limpeza vai pra fila."""
+    payload = await _verified_signed_request(request)
+    ig_user_id = str(payload["user_id"])
+    deauth_queue.submit(DeauthJob(kind=KIND_DEAUTHORIZE, ig_user_id=ig_user_id))
+    logger.info(
+        "Deauthorize recebido ig_user_id=%s", ig_user_id,
+        extra={"event": "deauth.received", "kind": KIND_DEAUTHORIZE, "ig_user_id": ig_user_id},
+    )
+    return {"success": True}
+
+
+@router.post("/instagram/data-deletion")
+async def instagram_data_deletion(request: Request):
+    """Data Deletion Request URL (Meta). Retorna `url` + `confirmation_code`
+    exigidos pela Meta; a exclusão roda na fila."""
+    payload = await _verified_signed_request(request)
+    ig_user_id = str(payload["user_id"])
+    confirmation_code = uuid.uuid4().hex
+    deauth_queue.submit(DeauthJob(
+        kind=KIND_DATA_DELETION, ig_user_id=ig_user_id, confirmation_code=confirmation_code,
+    ))
+    logger.info(
+        "Data deletion recebido ig_user_id=%s code=%s", ig_user_id, confirmation_code,
+        extra={"event": "deauth.received", "kind": KIND_DATA_DELETION, "ig_user_id": ig_user_id},
+    )
+    base_url = os.getenv("PUBLIC_BASE_URL", "").rstrip("/") or str(request.base_url).rstrip("/")
+    return {
+        "url": f"{base_url}/auth/instagram/data-deletion/status?{urlencode({'code': confirmation_code})}",
+        "confirmation_code": confirmation_code,
+    }
+
+
+@router.get("/instagram/data-deletion/status")
+async def instagram_data_deletion_status(code: str):
+    """Status público de um pedido de exclusão (link devolvido à Meta)."""
+    if not code.isalnum() or len(code) > 64:
+        raise HTTPException(status_code=404, detail="Pedido não encontrado")
+    snap = firestore.Client().collection(DATA_DELETION_COLLECTION).document(code).get()
+    status = (snap.to_dict() or {}).get("status") if snap.exists else "pending"
+    return {"confirmation_code": code, "status": status}
 
 
 # --------------------------------------------------------------------------- #
@@ -316,6 +662,56 @@ async def instagram_process_callback(
 # --------------------------------------------------------------------------- #
 
 
+async def _meta_call(
+    stage: str,
+    send: Callable[[float], Awaitable[httpx.Response]],
+) -> httpx.Response:
+    """Uma chamada HTTP à Meta sob o limite adaptativo (core.concurrency) e o
+    deadline da request (core.deadline).
+
+    `send(timeout)` recebe o timeout da tentativa: min(30s, orçamento restante).
+    Só a chamada ocupa vaga — o sleep do backoff entre tentativas fica fora.
+    Sem vaga: OverloadedError (503); orçamento esgotado: DeadlineExceeded (504).
+    """
+    queue_wait = deadline.timeout_for(meta_limiter.queue_timeout_s, stage)
+    async with meta_limiter.slot(max_wait_s=queue_wait) as slot:
+        attempt_timeout = deadline.timeout_for(_META_ATTEMPT_TIMEOUT_S, stage)
+        try:
+            # Timeout do httpx é por fase (connect/read/...); este limita a tentativa inteira.
+            async with asyncio.timeout(attempt_timeout):
+                resp = await send(attempt_timeout)
+        except (httpx.TimeoutException, TimeoutError) as e:
+            # Timeout encurtado pelo deadline: o cliente já desistiu, não é erro de rede.
+            if not deadline.can_fit(0):
+                slot.discard_sample()
+                raise DeadlineExceeded(stage) from e
+            if isinstance(e, httpx.TimeoutException):
+                raise
+            raise httpx.ReadTimeout(f"{stage}: sem resposta em {attempt_timeout:.1f}s") from e
+        if resp.status_code == 429 or resp.status_code >= 500:
+            slot.mark_overloaded()
+        return resp
+
+
+async def _backoff_before_retry(attempt: int, stage: str, reason: str) -> bool:
+    """Espera o backoff e libera a próxima tentativa — se ainda há tentativa e
+    se ela cabe no deadline (backoff + `_MIN_ATTEMPT_BUDGET_S`)."""
+    if attempt >= _LONG_TOKEN_MAX_ATTEMPTS:
+        return False
+    backoff = _LONG_TOKEN_BACKOFF_S[attempt - 1]
+    if not deadline.can_fit(backoff + _MIN_ATTEMPT_BUDGET_S):
+        logger.warning(
+            "%s: tentativa %d pulada — não cabe no deadline (restante=%.1fs)",
+            stage, attempt + 1, deadline.remaining() or 0.0,
+            extra={"event": "deadline.retry_skipped", "meta_stage": stage},
+        )
+        events.emit(events.EVENT_RETRY_SKIPPED, stage=stage, attempt=attempt + 1, reason=reason)
+        return False
+    events.emit(events.EVENT_RETRY, stage=stage, attempt=attempt + 1, reason=reason)
+    await asyncio.sleep(backoff)
+    return True
+
+
 async def _exchange_code_for_short_token(
     client: httpx.AsyncClient,
     app_id: str,
@@ -324,16 +720,17 @@ async def _exchange_code_for_short_token(
     redirect_uri: str,
     *,
     existing_doc,
-) -> tuple[str, str]:
+) -> tuple[str, str, Optional[frozenset[str]]]:
     """POST x-www-form-urlencoded para api.instagram.com/oauth/access_token.
 
-    Retorna (short_token, ig_user_id). Faz retry em erro transitório da Meta
+    Retorna (short_token, ig_user_id, permissions concedidas — None se a Meta
+    não informou). Faz retry em erro transitório da Meta
     (vide _is_transient_meta_error); NÃO retenta code já usado / secret errado.
     """
     last_body: dict = {}
     for attempt in range(1, _LONG_TOKEN_MAX_ATTEMPTS + 1):
         try:
-            resp = await client.post(
+            resp = await _meta_call("code_exchange", lambda timeout: client.post(
                 INSTAGRAM_TOKEN_URL,
                 data={
                     "client_id": app_id,
@@ -343,14 +740,14 @@ async def _exchange_code_for_short_token(
                     "code": code,
                 },
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
-            )
+                timeout=timeout,
+            ))
         except httpx.RequestError as e:
             logger.warning(
                 "code→short_token tentativa %d/%d falhou no transporte: %s",
                 attempt, _LONG_TOKEN_MAX_ATTEMPTS, e,
             )
-            if attempt < _LONG_TOKEN_MAX_ATTEMPTS:
-                await asyncio.sleep(_LONG_TOKEN_BACKOFF_S[attempt - 1])
+            if await _backoff_before_retry(attempt, "code_exchange", "transport"):
                 continue
             raise HTTPException(status_code=400, detail=f"Erro de rede ao trocar code por token: {e}")
 
@@ -367,8 +764,9 @@ async def _exchange_code_for_short_token(
             logger.info(
                 "code→short OK (try %d): ig_user_id=%s permissions=%s",
                 attempt, ig_user_id, payload.get("permissions"),
+                extra={"event": "meta.code_exchange_ok", "ig_user_id": ig_user_id},
             )
-            return short_token, ig_user_id
+            return short_token, ig_user_id, _parse_permissions(payload.get("permissions"))
 
         last_body = resp.json() if resp.content else {}
         error_msg = last_body.get("error_message") or last_body.get("error", {}).get("message", "")
@@ -377,7 +775,12 @@ async def _exchange_code_for_short_token(
         if "has been used" in str(error_msg).lower() and existing_doc and existing_doc.exists:
             data = existing_doc.to_dict() or {}
             logger.warning("Código já usado; devolvendo integração existente")
-            response_data = _build_response_from_doc(data, message="Integração já configurada.")
+            events.emit(events.EVENT_CODE_REUSED)
+            response_data = _build_response_from_doc(
+                data,
+                message="Integração já configurada.",
+                accounts=load_accounts(existing_doc.reference, data),
+            )
             # Lança HTTPException pra interromper o fluxo principal
             raise HTTPException(status_code=200, detail=response_data.model_dump())
 
@@ -385,9 +788,9 @@ async def _exchange_code_for_short_token(
         logger.error(
             "IG /oauth/access_token retornou %d (tentativa %d/%d, transitório=%s): %s",
             resp.status_code, attempt, _LONG_TOKEN_MAX_ATTEMPTS, transient, last_body,
+            extra=_meta_error_fields("code_exchange", resp.status_code, attempt, transient, last_body),
         )
-        if transient and attempt < _LONG_TOKEN_MAX_ATTEMPTS:
-            await asyncio.sleep(_LONG_TOKEN_BACKOFF_S[attempt - 1])
+        if transient and await _backoff_before_retry(attempt, "code_exchange", f"meta_{resp.status_code}"):
             continue
         break
 
@@ -408,6 +811,25 @@ async def _exchange_code_for_short_token(
 # mesmo soluço transitório.
 _LONG_TOKEN_MAX_ATTEMPTS = 3
 _LONG_TOKEN_BACKOFF_S = (0.6, 1.5)  # espera antes das tentativas 2 e 3
+_META_ATTEMPT_TIMEOUT_S = 30.0  # teto por tentativa (encurtado pelo deadline)
+_MIN_ATTEMPT_BUDGET_S = 1.0  # retry só se sobrar ao menos isso após o backoff
+
+
+def _meta_error_fields(stage: str, status_code: int, attempt: int, transient: bool, body: dict) -> dict:
+    """Campos estruturados (`extra=`) para logs de erro da Meta — consultáveis
+    no Cloud Logging sem parsear a mensagem."""
+    err = (body or {}).get("error") or {}
+    if not isinstance(err, dict):
+        err = {}
+    return {
+        "event": "meta.error",
+        "meta_stage": stage,
+        "meta_status": status_code,
+        "meta_error_code": err.get("code"),
+        "meta_error_type": err.get("type"),
+        "attempt": attempt,
+        "transient": transient,
+    }
 
 
 def _is_transient_meta_error(status_code: int, body: dict) -> bool:
@@ -417,9 +839,8 @@ def _is_transient_meta_error(status_code: int, body: dict) -> bool:
         return True
     err = (body or {}).get("error") or {}
     code = err.get("code")
-    msg = str(err.get("message") or "").lower()
     # code 100 + "unsupported request - method type: get" = glitch de roteamento
-    if code == 100 and "unsupported request" in msg:
+    if _is_unsupported_request(body):
         return True
     # codes documentados como transitórios: 1 (unknown), 2 (service indisponível)
     if code in (1, 2):
@@ -427,34 +848,68 @@ def _is_transient_meta_error(status_code: int, body: dict) -> bool:
     return False
 
 
+def _is_unsupported_request(body: dict) -> bool:
+    """code 100 "Unsupported request": glitch de roteamento OU conta inelegível."""
+    err = (body or {}).get("error") or {}
+    if not isinstance(err, dict):
+        return False
+    return err.get("code") == 100 and "unsupported request" in str(err.get("message") or "").lower()
+
+
+# Escopo que a Meta só concede a conta Profissional (Comercial/Criador).
+_ELIGIBILITY_SCOPE = "instagram_business_basic"
+
+
+def _parse_permissions(raw) -> Optional[frozenset[str]]:
+    """`permissions` da troca do code: CSV ou lista, conforme a versão da API."""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    return frozenset(str(p).strip() for p in raw if str(p).strip())
+
+
+def _likely_ineligible(ig_user_id: str, permissions: Optional[frozenset[str]]) -> Optional[str]:
+    """Motivo para tratar a conta como (provavelmente) inelegível, ou None."""
+    if ig_user_id in ineligible_accounts:
+        return "known_ineligible"
+    if permissions is not None and _ELIGIBILITY_SCOPE not in permissions:
+        return "missing_business_scope"
+    return None
+
+
 async def _exchange_short_for_long_token(
     client: httpx.AsyncClient,
     app_secret: str,
     short_token: str,
+    *,
+    retry_unsupported: bool = True,
 ) -> tuple[str, int]:
     """GET graph.instagram.com/access_token?grant_type=ig_exchange_token.
 
     Retorna (long_token, expires_in_seconds). Faz retry em erro transitório da
-    Meta (vide _is_transient_meta_error).
+    Meta (vide _is_transient_meta_error). `retry_unsupported=False` (conta
+    suspeita de inelegível) trata o code 100 como definitivo; 5xx e erro de
+    transporte continuam com retry.
     """
     last_body: dict = {}
     for attempt in range(1, _LONG_TOKEN_MAX_ATTEMPTS + 1):
         try:
-            resp = await client.get(
+            resp = await _meta_call("long_token_exchange", lambda timeout: client.get(
                 INSTAGRAM_GRAPH_LONG_TOKEN_URL,
                 params={
                     "grant_type": "ig_exchange_token",
                     "client_secret": app_secret,
                     "access_token": short_token,
                 },
-            )
+                timeout=timeout,
+            ))
         except httpx.RequestError as e:
             logger.warning(
                 "ig_exchange_token tentativa %d/%d falhou no transporte: %s",
                 attempt, _LONG_TOKEN_MAX_ATTEMPTS, e,
             )
-            if attempt < _LONG_TOKEN_MAX_ATTEMPTS:
-                await asyncio.sleep(_LONG_TOKEN_BACKOFF_S[attempt - 1])
+            if await _backoff_before_retry(attempt, "long_token_exchange", "transport"):
                 continue
             raise HTTPException(status_code=400, detail=f"Erro de rede ao converter token: {e}")
 
@@ -470,12 +925,14 @@ async def _exchange_short_for_long_token(
 
         last_body = resp.json() if resp.content else {}
         transient = _is_transient_meta_error(resp.status_code, last_body)
+        if transient and not retry_unsupported and _is_unsupported_request(last_body):
+            transient = False
         logger.error(
             "ig_exchange_token retornou %d (tentativa %d/%d, transitório=%s): %s",
             resp.status_code, attempt, _LONG_TOKEN_MAX_ATTEMPTS, transient, last_body,
+            extra=_meta_error_fields("long_token_exchange", resp.status_code, attempt, transient, last_body),
         )
-        if transient and attempt < _LONG_TOKEN_MAX_ATTEMPTS:
-            await asyncio.sleep(_LONG_TOKEN_BACKOFF_S[attempt - 1])
+        if transient and await _backoff_before_retry(attempt, "long_token_exchange", f"meta_{resp.status_code}"):
             continue
         break
 
@@ -488,29 +945,32 @@ async def _exchange_short_for_long_token(
 async def _fetch_instagram_profile(
     client: httpx.AsyncClient,
     long_token: str,
+    *,
+    retry_unsupported: bool = True,
 ) -> dict:
     """GET graph.instagram.com/v20.0/me — busca id, username, account_type, etc.
 
     Faz retry em erro transitório da Meta (vide _is_transient_meta_error); NÃO
-    retenta token inválido (code 190) / permissão.
+    retenta token inválido (code 190) / permissão. `retry_unsupported` como em
+    _exchange_short_for_long_token.
     """
     last_body: dict = {}
     for attempt in range(1, _LONG_TOKEN_MAX_ATTEMPTS + 1):
         try:
-            resp = await client.get(
+            resp = await _meta_call("profile", lambda timeout: client.get(
                 INSTAGRAM_GRAPH_ME_URL,
                 params={
                     "fields": "id,username,account_type,followers_count,media_count,profile_picture_url,name",
                     "access_token": long_token,
                 },
-            )
+                timeout=timeout,
+            ))
         except httpx.RequestError as e:
             logger.warning(
                 "/me tentativa %d/%d falhou no transporte: %s",
                 attempt, _LONG_TOKEN_MAX_ATTEMPTS, e,
             )
-            if attempt < _LONG_TOKEN_MAX_ATTEMPTS:
-                await asyncio.sleep(_LONG_TOKEN_BACKOFF_S[attempt - 1])
+            if await _backoff_before_retry(attempt, "profile", "transport"):
                 continue
             raise HTTPException(status_code=400, detail=f"Erro de rede ao buscar perfil Instagram: {e}")
 
@@ -521,12 +981,14 @@ async def _fetch_instagram_profile(
 
         last_body = resp.json() if resp.content else {}
         transient = _is_transient_meta_error(resp.status_code, last_body)
+        if transient and not retry_unsupported and _is_unsupported_request(last_body):
+            transient = False
         logger.error(
             "/me retornou %d (tentativa %d/%d, transitório=%s): %s",
             resp.status_code, attempt, _LONG_TOKEN_MAX_ATTEMPTS, transient, last_body,
+            extra=_meta_error_fields("profile", resp.status_code, attempt, transient, last_body),
         )
-        if transient and attempt < _LONG_TOKEN_MAX_ATTEMPTS:
-            await asyncio.sleep(_LONG_TOKEN_BACKOFF_S[attempt - 1])
+        if transient and await _backoff_before_retry(attempt, "profile", f"meta_{resp.status_code}"):
             continue
         break
 
@@ -536,22 +998,38 @@ async def _fetch_instagram_profile(
     )
 
 
-def _build_response_from_doc(data: dict, *, message: str) -> InstagramCallbackResponse:
-    accounts_data = data.get("instagram_accounts", [])
-    accounts = [
-        InstagramAccount(
-            id=acc.get("id", ""),
-            username=acc.get("username"),
-            name=acc.get("name") or acc.get("username"),
-        )
-        for acc in accounts_data
-    ]
-    return InstagramCallbackResponse(
-        api_key=data.get("api_key", ""),
-        instagram_accounts=accounts,
-        message=message,
-        status="success",
-    )
+def _build_response_from_doc(
+    data: dict,
+    *,
+    message: str,
+    accounts: Optional[list[dict]] = None,
+) -> InstagramCallbackResponse:
+    """`accounts`: contas já carregadas (core.accounts_store.load_accounts).
+    Se None, usa o array legado `instagram_accounts` do doc raiz."""
+    accounts_data = accounts if accounts is not None else data.get("instagram_accounts", [])
+    return _callback_response(data.get("api_key") or "", accounts_data, message=message)
+
+
+def _callback_response(api_key: str, accounts: list[dict], *, message: str) -> InstagramCallbackResponse:
+    """Monta o response a partir das contas do Firestore.
+
+    Um único `model_validate` sobre dicts simples: a validação roda inteira no
+    pydantic-core (Rust). Instanciar `InstagramAccount(...)` ou
+    `model_construct` conta a conta custa mais em Python (~3µs/conta) que isso.
+    """
+    return InstagramCallbackResponse.model_validate({
+        "api_key": api_key,
+        "instagram_accounts": [
+            {
+                "id": str(acc.get("id", "")),
+                "username": acc.get("username"),
+                "name": acc.get("name") or acc.get("username"),
+            }
+            for acc in accounts
+        ],
+        "message": message,
+        "status": "success",
+    })
 
 
 def _dt_module():
@@ -2,7 +2,7 @@
 Schemas para autenticação OAuth Instagram/Meta
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 
@@ -25,6 +25,9 @@ class InstagramCallbackRequest(BaseModel):
     code: str
     state: str
     redirect_uri: str
+    # Opt-in: responde 202 + job_id logo após a troca do code; o resto roda
+    # em background e o resultado sai em GET .../process-callback/jobs/{job_id}.
+    async_mode: bool = False
 
 
 class InstagramAccount(BaseModel):
@@ -49,3 +52,47 @@ class InstagramCallbackResponse(BaseModel):
     status: str
     redirect_url: Optional[str] = None
 
+
+class InstagramCallbackJobResponse(BaseModel):
+    """Response 202 do modo assíncrono do callback"""
+    job_id: str
+    status: str
+    status_url: str
+
+
+class InstagramDisconnectRequest(BaseModel):
+    """Request para desconectar contas do próprio usuário"""
+    account_ids: List[str] = []
+    # True desconecta todas as contas (ignora account_ids).
+    all_accounts: bool = False
+
+
+class DisconnectFailure(BaseModel):
+    """Falha parcial numa desconexão"""
+    user_uid: str
+    account_id: Optional[str] = None
+    stage: str  # firestore | secret | not_found
+    error: Optional[str] = None
+    api_key: Optional[str] = None  # stage=secret: secret a revogar à mão (a conta já saiu do doc)
+
+
+class InstagramDisconnectResponse(BaseModel):
+    """Response da desconexão (status `partial` se houve falhas)"""
+    status: str
+    integrations: int
+    accounts_removed: int
+    secrets_revoked: int
+    failures: List[DisconnectFailure] = []
+
+
+class AdminDisconnectTarget(BaseModel):
+    """Usuário (e contas) a desconectar em lote; sem account_ids = todas"""
+    user_uid: str
+    account_ids: Optional[List[str]] = None
+
+
+class AdminDisconnectRequest(BaseModel):
+    """Request da desconexão em lote (admin)"""
+    targets: List[AdminDisconnectTarget] = Field(..., min_length=1, max_length=10_000)
+    # True destrói as versões dos secrets (irreversível); default só desabilita.
+    destroy_secrets: bool = False
@@ -0,0 +1,344 @@
+"""Backfill/normalização da coleção `integrations`.
+
+Os docs têm formatos de várias épocas: `api_key` só na raiz (pré token por
+conta), sem `token_expires_in_seconds`, contas sem `account_type`, docs do
+antigo fluxo Facebook Login sem `auth_provider`, docs array sem o resumo
+`account_ids`/`account_count`. Este CLI:
+
+- varre a coleção com paginação por cursor (memória constante: 1 página);
+- passa cada doc (e cada conta) pelos passos selecionados (`--steps`);
+- grava só o diff via BulkWriter (ops/s limitado por `--max-ops`), com flush
+  por página; docs array são reescritos com precondição `last_update_time`
+  (conexão concorrente → conflito contado, sem sobrescrever); docs
+  subcollection com conta alterada têm a raiz tocada depois do flush (o cache
+  da listagem de contas valida pelo update_time da raiz);
+- salva checkpoint após cada página persistida sem erro (`--checkpoint`,
+  retomável); página com falha interrompe o run sem avançar o cursor;
+- `--dry-run`: só conta e loga exemplos de diff.
+
+    python -m scripts.backfill_integrations --checkpoint backfill.json --dry-run
+    python -m scripts.backfill_integrations --steps token_expiry,account_type
+
+Novos passos: subclasse de `BackfillStep` + `@register`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+from typing import Optional
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
+
+from core.accounts_store import LAYOUT_SUBCOLLECTION, accounts_collection, layout_of, touch_roots
+from core.firestore_scan import DEFAULT_PAGE_SIZE, Checkpoint, iter_pages
+from core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# gRPC FAILED_PRECONDITION — doc mudou depois da leitura (last_update_time).
+_FAILED_PRECONDITION = 9
+
+
+class StepConflict(Exception):
+    """Passo não consegue decidir o valor com segurança: conta é pulada e
+    contada em `conflicts`."""
+
+
+class BackfillStep:
+    """Passo de normalização. Retorna só os campos a alterar ({} = nada)."""
+
+    name = ""
+    description = ""
+
+    def transform_root(self, data: dict) -> dict:
+        return {}
+
+    def transform_account(self, account: dict, root: dict) -> dict:
+        return {}
+
+
+STEPS: dict[str, BackfillStep] = {}
+
+
+def register(cls: type[BackfillStep]) -> type[BackfillStep]:
+    STEPS[cls.name] = cls()
+    return cls
+
+
+def _account_total(root: dict) -> int:
+    if layout_of(root) == LAYOUT_SUBCOLLECTION:
+        return int(root.get("account_count") or len(root.get("account_ids") or []))
+    return len(root.get("instagram_accounts") or [])
+
+
+@register
+class LegacyApiKeyStep(BackfillStep):
+    name = "legacy_api_key"
+    description = "Conta sem api_key herda o api_key da raiz (só integração com 1 conta)"
+
+    def transform_account(self, account: dict, root: dict) -> dict:
+        if account.get("api_key") or not root.get("api_key"):
+            return {}
+        # O api_key da raiz é o da ÚLTIMA conta conectada: com várias contas
+        # não há como saber de qual delas é o token.
+        if _account_total(root) != 1:
+            raise StepConflict(f"{self.name}: conta {account.get('id')} sem api_key em integração multi-conta")
+        return {"api_key": root["api_key"]}
+
+
+@register
+class TokenExpiryStep(BackfillStep):
+    name = "token_expiry"
+    description = "token_expires_in_seconds ausente → 0 (desconhecido, igual ao callback)"
+
+    def transform_root(self, data: dict) -> dict:
+        return {} if "token_expires_in_seconds" in data else {"token_expires_in_seconds": 0}
+
+    def transform_account(self, account: dict, root: dict) -> dict:
+        if "token_expires_in_seconds" in account:
+            return {}
+        return {"token_expires_in_seconds": int(root.get("token_expires_in_seconds") or 0)}
+
+
+@register
+class AccountTypeStep(BackfillStep):
+    name = "account_type"
+    description = "account_type ausente → BUSINESS (mesmo default do callback)"
+
+    def transform_account(self, account: dict, root: dict) -> dict:
+        return {} if account.get("account_type") else {"account_type": "BUSINESS"}
+
+
+@register
+class FacebookLoginProviderStep(BackfillStep):
+    name = "facebook_login_provider"
+    description = "Doc sem auth_provider (fluxo Facebook Login antigo) → auth_provider=facebook_login"
+
+    def transform_root(self, data: dict) -> dict:
+        if data.get("auth_provider"):
+            return {}
+        updates = {"auth_provider": "facebook_login"}
+        if not data.get("platform"):
+            updates["platform"] = "instagram"
+        return updates
+
+
+@register
+class AccountIndexStep(BackfillStep):
+    name = "account_index"
+    description = "Docs array sem account_ids/account_count (resumo usado em consultas)"
+
+    def transform_root(self, data: dict) -> dict:
+        if layout_of(data) == LAYOUT_SUBCOLLECTION:
+            return {}
+        ids = [str(a.get("id")) for a in (data.get("instagram_accounts") or []) if a.get("id")]
+        updates = {}
+        if data.get("account_ids") != ids:
+            updates["account_ids"] = ids
+        if data.get("account_count") != len(ids):
+            updates["account_count"] = len(ids)
+        return updates
+
+
+class _WriteErrors:
+    """Callback de erro do BulkWriter (chamado em threads do executor)."""
+
+    def __init__(self, max_attempts: int = 5):
+        self.max_attempts = max_attempts
+        self.conflicts = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, failure, _bulk_writer) -> bool:
+        if failure.code == _FAILED_PRECONDITION:
+            with self._lock:
+                self.conflicts += 1
+            logger.warning("Conflito (doc alterado durante o backfill): %s", failure.message)
+            return False
+        if failure.attempts < self.max_attempts:
+            return True
+        with self._lock:
+            self.failures += 1
+        logger.error("Escrita falhou após %d tentativas: %s", failure.attempts, failure.message)
+        return False
+
+
+def _apply_account_steps(steps: list[BackfillStep], account: dict, root: dict, conflicts: list[str]) -> dict:
+    updates: dict = {}
+    for step in steps:
+        try:
+            updates.update(step.transform_account({**account, **updates}, root))
+        except StepConflict as e:
+            conflicts.append(str(e))
+            logger.warning("Conflito: %s", e)
+    return updates
+
+
+def backfill_document(
+    db, bulk_writer, snap, steps: list[BackfillStep], *, dry_run: bool, touched: Optional[list] = None,
+) -> tuple[int, int]:
+    """Normaliza um doc (e suas contas). Retorna (escritas geradas, conflitos de passo).
+
+    Raízes com subdoc de conta alterado vão para `touched` (tocar depois do
+    flush, vide accounts_store.touch_roots).
+    """
+    data = snap.to_dict() or {}
+    root_updates: dict = {}
+    for step in steps:
+        root_updates.update(step.transform_root({**data, **root_updates}))
+    root_view = {**data, **root_updates}
+    writes = 0
+    conflicts: list[str] = []
+
+    if layout_of(data) == LAYOUT_SUBCOLLECTION:
+        account_writes = 0
+        for account_snap in accounts_collection(snap.reference).stream():
+            account_updates = _apply_account_steps(steps, account_snap.to_dict() or {}, root_view, conflicts)
+            if not account_updates:
+                continue
+            account_writes += 1
+            if dry_run:
+                logger.debug("[dry-run] %s/%s: %s", snap.id, account_snap.id, account_updates)
+            else:
+                bulk_writer.update(account_snap.reference, account_updates)
+        writes += account_writes
+        if account_writes and not dry_run and touched is not None:
+            touched.append(snap.reference)
+        option = None
+    else:
+        accounts = data.get("instagram_accounts") or []
+        new_accounts = []
+        changed = False
+        for account in accounts:
+            account_updates = _apply_account_steps(steps, account, root_view, conflicts)
+            changed = changed or bool(account_updates)
+            new_accounts.append({**account, **account_updates})
+        if changed:
+            root_updates["instagram_accounts"] = new_accounts
+        # O array inteiro é reescrito: só grava se ninguém mexeu no doc desde a leitura.
+        option = db.write_option(last_update_time=snap.update_time)
+
+    if root_updates:
+        writes += 1
+        if dry_run:
+            logger.info(
+                "[dry-run] %s: %s", snap.id,
+                {k: v for k, v in root_updates.items() if k != "instagram_accounts"},
+            )
+        else:
+            bulk_writer.update(snap.reference, root_updates, option=option)
+    return writes, len(conflicts)
+
+
+def run(
+    *,
+    steps: list[BackfillStep],
+    page_size: int,
+    checkpoint_path: Optional[str],
+    dry_run: bool,
+    max_ops_per_second: int,
+    limit: Optional[int] = None,
+) -> dict:
+    db = firestore.Client()
+    checkpoint = Checkpoint(checkpoint_path)
+    errors = _WriteErrors()
+    bulk_writer = db.bulk_writer(
+        options=BulkWriterOptions(
+            initial_ops_per_second=min(500, max_ops_per_second),
+            max_ops_per_second=max_ops_per_second,
+        )
+    )
+    bulk_writer.on_write_error(errors)
+
+    try:
+        for page in iter_pages(
+            db.collection("integrations"), page_size=page_size, start_after=checkpoint.last_doc_id,
+        ):
+            conflicts_before, failures_before = errors.conflicts, errors.failures
+            doc_errors = 0
+            touched: list = []
+            for snap in page:
+                checkpoint.incr("scanned")
+                try:
+                    writes, step_conflicts = backfill_document(
+                        db, bulk_writer, snap, steps, dry_run=dry_run, touched=touched,
+                    )
+                except Exception as e:
+                    doc_errors += 1
+                    checkpoint.incr("errors")
+                    logger.error("Falha no doc %s: %s", snap.id, e, exc_info=True)
+                    continue
+                checkpoint.incr("conflicts", step_conflicts)
+                if writes:
+                    checkpoint.incr("changed_docs")
+                    checkpoint.incr("writes", writes)
+            # Flush por página: limita escritas em voo e só avança o checkpoint
+            # depois que a página foi persistida.
+            bulk_writer.flush()
+            if touched:
+                # Só depois das contas: o cache da listagem valida pela raiz.
+                checkpoint.incr("writes", touch_roots(bulk_writer, touched))
+                bulk_writer.flush()
+            # Contadores do run somam aos do checkpoint (retomada não zera).
+            write_conflicts = errors.conflicts - conflicts_before
+            write_failures = errors.failures - failures_before
+            checkpoint.incr("conflicts", write_conflicts)
+            checkpoint.incr("write_failures", write_failures)
+            if doc_errors or write_conflicts or write_failures:
+                # Não avança: a próxima execução refaz a página (passos só gravam diff).
+                logger.error(
+                    "Página até %s com falhas (docs=%d, conflitos de escrita=%d, escritas=%d); "
+                    "parando sem avançar o checkpoint — rode de novo para retomar",
+                    page[-1].id, doc_errors, write_conflicts, write_failures,
+                )
+                break
+            if not dry_run:
+                checkpoint.save(page[-1].id)
+            logger.info("Página até %s: %s", page[-1].id, checkpoint.counters)
+            if limit and checkpoint.counters.get("scanned", 0) >= limit:
+                break
+    finally:
+        bulk_writer.close()
+    return checkpoint.counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--steps", default=",".join(STEPS),
+        help=f"CSV de passos (default: todos). Disponíveis: {', '.join(STEPS)}",
+    )
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--checkpoint", help="Arquivo JSON de checkpoint (retomada)")
+    parser.add_argument("--dry-run", action="store_true", help="Só conta e loga diffs, não grava")
+    parser.add_argument("--max-ops", type=int, default=500, help="Teto de escritas/s do BulkWriter")
+    parser.add_argument("--limit", type=int, help="Para após N docs (aprox., por página)")
+    parser.add_argument("--list-steps", action="store_true")
+    args = parser.parse_args()
+
+    if args.list_steps:
+        for step in STEPS.values():
+            print(f"{step.name}: {step.description}")
+        return
+
+    unknown = [name for name in args.steps.split(",") if name and name not in STEPS]
+    if unknown:
+        parser.error(f"passos desconhecidos: {', '.join(unknown)}")
+
+    setup_logging()
+    counters = run(
+        steps=[STEPS[name] for name in args.steps.split(",") if name],
+        page_size=args.page_size,
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run,
+        max_ops_per_second=args.max_ops,
+        limit=args.limit,
+    )
+    logger.info("Backfill concluído: %s", counters)
+
+
+if __name__ == "__main__":
+    main()
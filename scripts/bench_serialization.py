@@ -0,0 +1,124 @@
+"""Benchmark da serialização do InstagramCallbackResponse.
+
+Compara, para N contas, o custo de CPU de:
+
+- `fastapi`: caminho padrão — modelo validado conta a conta e devolvido ao
+  FastAPI com `response_model` (dump → revalidação → jsonable_encoder → json);
+- `fast`: `_build_response_from_doc` (um model_validate) + `FastJSONResponse`.
+
+Roda offline, sem Firestore/Meta:
+
+    python -m scripts.bench_serialization --accounts 10,100,500,1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from core.responses import FastJSONResponse
+from routes.auth import _build_response_from_doc
+from schemas.instagram import InstagramAccount, InstagramCallbackResponse
+
+
+def _fake_accounts(n: int) -> list[dict]:
+    return [
+        {
+            "id": str(17841400000000000 + i),
+            "username": f"conta_{i}",
+            "name": f"Conta Agência {i}",
+            "account_type": "BUSINESS",
+            "followers_count": 1000 + i,
+            "media_count": i,
+            "profile_picture_url": f"https://scontent.cdninstagram.com/{i}.jpg",
+            "active": True,
+            "api_key": f"00000000-0000-0000-0000-{i:012d}",
+        }
+        for i in range(n)
+    ]
+
+
+def _validated_response(data: dict, accounts: list[dict]) -> InstagramCallbackResponse:
+    """Como o código montava antes: validação Pydantic em cada conta."""
+    return InstagramCallbackResponse(
+        api_key=data["api_key"],
+        instagram_accounts=[
+            InstagramAccount(
+                id=str(a.get("id")),
+                username=a.get("username"),
+                name=a.get("name") or a.get("username"),
+            )
+            for a in accounts
+        ],
+        message="Integração Instagram configurada com sucesso",
+        status="success",
+    )
+
+
+def _time_per_call(fn, repeat: int) -> float:
+    fn()  # aquecimento
+    samples = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        samples.append((time.perf_counter() - start) / repeat)
+    return statistics.median(samples)
+
+
+def bench(n_accounts: int, repeat: int) -> dict:
+    data = {"api_key": "00000000-0000-0000-0000-000000000000"}
+    accounts = _fake_accounts(n_accounts)
+    field = create_response_field(name="Response_bench", type_=InstagramCallbackResponse)
+    loop = asyncio.new_event_loop()
+
+    def fastapi_path() -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(
+                field=field,
+                response_content=_validated_response(data, accounts),
+                is_coroutine=True,
+            )
+        )
+        return JSONResponse(content).body
+
+    def fast_path() -> bytes:
+        response = _build_response_from_doc(
+            data, message="Integração Instagram configurada com sucesso", accounts=accounts,
+        )
+        return FastJSONResponse(response).body
+
+    try:
+        import json
+
+        assert json.loads(fastapi_path()) == json.loads(fast_path()), "saídas divergem"
+        before = _time_per_call(fastapi_path, repeat)
+        after = _time_per_call(fast_path, repeat)
+    finally:
+        loop.close()
+    return {"accounts": n_accounts, "fastapi_us": before * 1e6, "fast_us": after * 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", default="10,100,500,1000", help="CSV de tamanhos")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'contas':>8} {'fastapi (µs)':>14} {'fast (µs)':>12} {'ganho':>8}")
+    for n in (int(x) for x in args.accounts.split(",") if x):
+        r = bench(n, args.repeat)
+        print(
+            f"{r['accounts']:>8} {r['fastapi_us']:>14.0f} {r['fast_us']:>12.0f} "
+            f"{r['fastapi_us'] / r['fast_us']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
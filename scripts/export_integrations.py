@@ -0,0 +1,58 @@
+"""Exporta `integrations` em NDJSON, sem tokens (vide core.integrations_export).
+
+Mesmo formato do GET /admin/integrations/export, lendo direto do Firestore
+com as credenciais do ambiente. Memória constante: escreve página a página.
+
+    python -m scripts.export_integrations --out integrations.ndjson
+    python -m scripts.export_integrations --fields user_uid,status,accounts.username > parcial.ndjson
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+
+from google.cloud import firestore
+
+from core.firestore_scan import DEFAULT_PAGE_SIZE
+from core.integrations_export import InvalidFieldsError, iter_records, parse_fields, to_ndjson
+from core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def run(*, out, fields: str | None, page_size: int, start_after: str | None) -> int:
+    exported = 0
+    for page in iter_records(firestore.Client(), fields=fields, page_size=page_size, start_after=start_after):
+        out.write(to_ndjson(page))
+        out.flush()
+        exported += len(page)
+        logger.info("Exportadas %d integrações", exported)
+    return exported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="-", help="Arquivo de saída (default stdout)")
+    parser.add_argument("--fields", help="Projeção CSV, ex.: user_uid,status,accounts.username")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--start-after", help="Retoma depois deste user_uid (doc ID)")
+    args = parser.parse_args()
+
+    try:
+        parse_fields(args.fields)  # falha antes de abrir o arquivo
+    except InvalidFieldsError as e:
+        parser.error(str(e))
+    # stdout é a saída NDJSON: logs vão para o stderr.
+    setup_logging(stream=sys.stderr)
+    if args.out == "-":
+        total = run(out=sys.stdout.buffer, fields=args.fields, page_size=args.page_size, start_after=args.start_after)
+    else:
+        with open(args.out, "wb") as out:
+            total = run(out=out, fields=args.fields, page_size=args.page_size, start_after=args.start_after)
+    logger.info("Export concluído: %d integrações", total)
+
+
+if __name__ == "__main__":
+    main()
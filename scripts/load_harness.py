@@ -0,0 +1,141 @@
+"""Harness de carga: login + process-callback em loop contra um servidor.
+
+Pensado para rodar contra `scripts.offline_app:app` (stand-ins offline), mas
+funciona contra qualquer instância cujo Bearer token aceito seja o user_uid.
+
+    python -m scripts.load_harness --url http://127.0.0.1:8080 \\
+        --concurrency 64 --duration 30 --users 200
+
+Saída: throughput (fluxos completos/s) e latências p50/p95/p99 por endpoint.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: {"login": [], "callback": []})
+    errors: dict[str, int] = field(default_factory=dict)
+    flows: int = 0
+
+    def error(self, key: str) -> None:
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_flow(client: httpx.AsyncClient, user_uid: str, accounts_per_user: int, stats: Stats) -> None:
+    """Um fluxo OAuth completo: /login (extrai state) → /process-callback."""
+    headers = {"Authorization": f"Bearer {user_uid}"}
+    redirect_uri = "https://app.proof.social/auth/instagram/callback"
+
+    t0 = time.perf_counter()
+    resp = await client.post(
+        "/auth/instagram/login", json={"redirect_uri": redirect_uri}, headers=headers,
+    )
+    stats.latencies["login"].append(time.perf_counter() - t0)
+    if resp.status_code != 200:
+        stats.error(f"login:{resp.status_code}")
+        return
+    state = parse_qs(urlparse(resp.json()["auth_url"]).query)["state"][0]
+
+    account = f"{user_uid}-{random.randrange(accounts_per_user)}"
+    code = f"acct:{abs(hash(account)) % 10**12}:{uuid.uuid4().hex}"
+    t0 = time.perf_counter()
+    resp = await client.post(
+        "/auth/instagram/process-callback",
+        json={"code": code, "state": state, "redirect_uri": redirect_uri},
+        headers=headers,
+    )
+    stats.latencies["callback"].append(time.perf_counter() - t0)
+    if resp.status_code not in (200, 202):
+        stats.error(f"callback:{resp.status_code}")
+        return
+    stats.flows += 1
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    *,
+    concurrency: int,
+    duration_s: float,
+    users: int,
+    accounts_per_user: int,
+) -> tuple[Stats, float]:
+    stats = Stats()
+    deadline = time.monotonic() + duration_s
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            user_uid = f"load-user-{random.randrange(users)}"
+            try:
+                await run_flow(client, user_uid, accounts_per_user, stats)
+            except httpx.HTTPError as e:
+                stats.error(type(e).__name__)
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats, time.monotonic() - started
+
+
+def summarize(stats: Stats, elapsed: float) -> dict:
+    summary = {
+        "elapsed_s": round(elapsed, 2),
+        "flows": stats.flows,
+        "flows_per_s": round(stats.flows / elapsed, 1) if elapsed else 0.0,
+        "errors": stats.errors,
+    }
+    for name, values in stats.latencies.items():
+        summary[name] = {
+            "n": len(values),
+            "mean_ms": round(statistics.fmean(values) * 1000, 1) if values else 0.0,
+            "p50_ms": round(_percentile(values, 50) * 1000, 1),
+            "p95_ms": round(_percentile(values, 95) * 1000, 1),
+            "p99_ms": round(_percentile(values, 99) * 1000, 1),
+        }
+    return summary
+
+
+async def _main(args: argparse.Namespace) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0, limits=limits) as client:
+        stats, elapsed = await run_load(
+            client,
+            concurrency=args.concurrency,
+            duration_s=args.duration,
+            users=args.users,
+            accounts_per_user=args.accounts_per_user,
+        )
+    print(json.dumps(summarize(stats, elapsed), indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--accounts-per-user", type=int, default=3)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
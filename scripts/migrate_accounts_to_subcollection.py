@@ -0,0 +1,179 @@
+"""Migra integrações do layout `array` para `subcollection` (vide core.accounts_store).
+
+Para cada `integrations/{uid}` ainda no layout array, numa transação:
+1. grava cada item de `instagram_accounts` em `integrations/{uid}/instagram_accounts/{id}`;
+2. grava os campos-resumo no doc raiz e marca `accounts_layout=subcollection`;
+3. remove o array `instagram_accounts` (a não ser com `--keep-array`).
+
+A transação relê o doc, então uma conexão concorrente não se perde. Docs com
+mais contas do que cabem numa transação gravam as contas em lotes e viram o
+layout com precondição `last_update_time` (doc alterado no meio → refaz, até
+`_MAX_ATTEMPTS` vezes). Idempotente e retomável: o checkpoint guarda o último
+doc processado — nunca além de um doc que falhou (ids em `failed_ids`); rodar
+de novo pula o que já está no layout novo.
+
+    python -m scripts.migrate_accounts_to_subcollection --checkpoint migrate.json [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud import firestore
+
+from core.accounts_store import ACCOUNTS_SUBCOLLECTION, LAYOUT_SUBCOLLECTION, layout_of
+from core.firestore_scan import DEFAULT_PAGE_SIZE, Checkpoint, iter_pages
+from core.logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# Limite de escritas por transação Firestore é 500; reserva 1 pro doc raiz.
+_MAX_ACCOUNTS_PER_TRANSACTION = 499
+# Tentativas do caminho fora de transação quando o doc muda durante a cópia.
+_MAX_ATTEMPTS = 3
+
+
+class MigrationConflict(Exception):
+    """Doc alterado a cada tentativa da migração em lotes."""
+
+
+def _root_summary(accounts: list[dict], keep_array: bool) -> dict:
+    ids = [str(a.get("id")) for a in accounts if a.get("id")]
+    last = accounts[-1] if accounts else {}
+    summary = {
+        "accounts_layout": LAYOUT_SUBCOLLECTION,
+        "account_ids": ids,
+        "account_count": len(ids),
+        "last_account": {"id": str(last.get("id") or ""), "username": last.get("username") or ""},
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+    if not keep_array:
+        summary["instagram_accounts"] = firestore.DELETE_FIELD
+    return summary
+
+
+def migrate_document(db, integration_ref, *, keep_array: bool) -> int:
+    """Migra um doc (transacional). Retorna nº de contas movidas (0 = nada a fazer)."""
+
+    @firestore.transactional
+    def _run(transaction) -> int:
+        snap = integration_ref.get(transaction=transaction)
+        data = snap.to_dict() or {}
+        if not snap.exists or layout_of(data) == LAYOUT_SUBCOLLECTION:
+            return 0
+        accounts = [a for a in (data.get("instagram_accounts") or []) if a.get("id")]
+        subcollection = integration_ref.collection(ACCOUNTS_SUBCOLLECTION)
+        for account in accounts:
+            transaction.set(subcollection.document(str(account["id"])), account)
+        transaction.update(integration_ref, _root_summary(accounts, keep_array))
+        return len(accounts)
+
+    data = integration_ref.get().to_dict() or {}
+    if len(data.get("instagram_accounts") or []) <= _MAX_ACCOUNTS_PER_TRANSACTION:
+        return _run(db.transaction())
+
+    # Raro: não cabe numa transação. Grava as contas em lotes e vira o layout
+    # por último, só se o doc não mudou desde a leitura; se mudou (conexão
+    # concorrente), relê e refaz. Se cair no meio, o doc continua `array`.
+    subcollection = integration_ref.collection(ACCOUNTS_SUBCOLLECTION)
+    written: set[str] = set()
+    for attempt in range(1, _MAX_ATTEMPTS + 1):
+        snap = integration_ref.get()
+        data = snap.to_dict() or {}
+        if not snap.exists or layout_of(data) == LAYOUT_SUBCOLLECTION:
+            return 0
+        accounts = [a for a in (data.get("instagram_accounts") or []) if a.get("id")]
+        logger.warning(
+            "Integração %s com %d contas — migrando fora de transação (tentativa %d/%d)",
+            integration_ref.id, len(accounts), attempt, _MAX_ATTEMPTS,
+        )
+        ids = {str(a["id"]) for a in accounts}
+        # Conta removida do array entre tentativas: apaga o subdoc já copiado.
+        ops = [("delete", account_id, None) for account_id in sorted(written - ids)]
+        ops += [("set", str(a["id"]), a) for a in accounts]
+        for start in range(0, len(ops), _MAX_ACCOUNTS_PER_TRANSACTION):
+            batch = db.batch()
+            for op, account_id, account in ops[start:start + _MAX_ACCOUNTS_PER_TRANSACTION]:
+                if op == "delete":
+                    batch.delete(subcollection.document(account_id))
+                else:
+                    batch.set(subcollection.document(account_id), account)
+            batch.commit()
+        written = ids
+        try:
+            integration_ref.update(
+                _root_summary(accounts, keep_array),
+                option=db.write_option(last_update_time=snap.update_time),
+            )
+            return len(accounts)
+        except FailedPrecondition:
+            logger.warning("Integração %s alterada durante a migração — refazendo", integration_ref.id)
+    raise MigrationConflict(f"integração {integration_ref.id} alterada em {_MAX_ATTEMPTS} tentativas")
+
+
+def run(*, page_size: int, checkpoint_path: str | None, dry_run: bool, keep_array: bool) -> dict:
+    db = firestore.Client()
+    checkpoint = Checkpoint(checkpoint_path)
+    collection = db.collection("integrations")
+
+    # Depois da 1ª falha o cursor não avança mais: o run segue migrando (é
+    # idempotente), mas a retomada recomeça antes do doc que falhou.
+    failed = False
+    for page in iter_pages(collection, page_size=page_size, start_after=checkpoint.last_doc_id):
+        last_ok = checkpoint.last_doc_id
+        for snap in page:
+            checkpoint.incr("scanned")
+            data = snap.to_dict() or {}
+            if layout_of(data) == LAYOUT_SUBCOLLECTION:
+                if not failed:
+                    last_ok = snap.id
+                continue
+            if dry_run:
+                checkpoint.incr("would_migrate")
+                checkpoint.incr("accounts", len(data.get("instagram_accounts") or []))
+                continue
+            try:
+                moved = migrate_document(db, snap.reference, keep_array=keep_array)
+            except Exception as e:
+                failed = True
+                checkpoint.incr("errors")
+                checkpoint.record_failure(snap.id)
+                logger.error("Falha migrando integração %s: %s", snap.id, e, exc_info=True)
+                continue
+            if not failed:
+                last_ok = snap.id
+            checkpoint.clear_failure(snap.id)
+            checkpoint.incr("migrated")
+            checkpoint.incr("accounts", moved)
+        if not dry_run:
+            checkpoint.save(last_ok)
+        logger.info("Página até %s: %s", page[-1].id, checkpoint.counters)
+
+    if checkpoint.failed_ids:
+        logger.error("Integrações com falha (refeitas na retomada): %s", checkpoint.failed_ids)
+
+    return checkpoint.counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--checkpoint", help="Arquivo JSON de checkpoint (retomada)")
+    parser.add_argument("--dry-run", action="store_true", help="Só conta, não grava")
+    parser.add_argument("--keep-array", action="store_true", help="Não remove o array legado do doc raiz")
+    args = parser.parse_args()
+
+    setup_logging()
+    counters = run(
+        page_size=args.page_size,
+        checkpoint_path=args.checkpoint,
+        dry_run=args.dry_run,
+        keep_array=args.keep_array,
+    )
+    logger.info("Migração concluída: %s", counters)
+
+
+if __name__ == "__main__":
+    main()
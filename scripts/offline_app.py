@@ -0,0 +1,469 @@
+"""App com stand-ins offline de Meta, Firestore, Secret Manager e Firebase Auth.
+
+Para carga/soak local sem tocar em GCP nem na Meta. Os stand-ins imitam o
+comportamento relevante para performance:
+
+- Firestore / Secret Manager: chamadas SÍNCRONAS com `time.sleep` (bloqueiam o
+  event loop como o client gRPC real) — `OFFLINE_BLOCKING_MS`, default 5.
+- Meta (httpx): latência assíncrona — `OFFLINE_META_LATENCY_MS`, default 80.
+- Firebase: o próprio Bearer token é o user_uid.
+
+Uso:
+    gunicorn -c gunicorn.conf.py scripts.offline_app:app
+    uvicorn scripts.offline_app:app --port 8080
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime as _dt
+import hashlib
+import os
+import threading
+import time
+import weakref
+from urllib.parse import parse_qs
+
+os.environ.setdefault("OAUTH_STATE_SIGNING_KEY", "offline-signing-key")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import firebase_admin.auth  # noqa: E402
+import httpx  # noqa: E402
+from google.cloud import firestore, secretmanager  # noqa: E402
+
+BLOCKING_S = float(os.getenv("OFFLINE_BLOCKING_MS", "5")) / 1000.0
+META_LATENCY_S = float(os.getenv("OFFLINE_META_LATENCY_MS", "80")) / 1000.0
+
+# Contadores de instâncias criadas — o soak usa para detectar clientes vazando.
+instances = {"firestore": 0, "secretmanager": 0, "httpx": 0}
+# Instâncias ainda vivas (cada cliente real segura canal gRPC/pool de conexões).
+live = {name: weakref.WeakSet() for name in instances}
+
+
+def _block() -> None:
+    if BLOCKING_S:
+        time.sleep(BLOCKING_S)
+
+
+# --------------------------------------------------------------------------- #
+# Firestore                                                                   #
+# --------------------------------------------------------------------------- #
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: dict | None, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+        self.update_time = update_time
+
+    def to_dict(self) -> dict | None:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str):
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentReference:
+    def __init__(self, store: "FakeStore", path: str):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self._store, f"{self.path}/{name}")
+
+    def get(self, **_kw) -> FakeSnapshot:
+        _block()
+        data, update_time = self._store.read(self.path)
+        return FakeSnapshot(self, data, update_time)
+
+    def set(self, data: dict, merge: bool = False, **_kw) -> None:
+        _block()
+        self._store.write(self.path, data, merge=merge)
+
+    def update(self, data: dict, **_kw) -> None:
+        _block()
+        if self._store.read(self.path)[0] is None:
+            raise KeyError(f"documento inexistente: {self.path}")
+        self._store.write(self.path, data, merge=True)
+
+    def create(self, data: dict, **_kw) -> None:
+        _block()
+        if self._store.read(self.path)[0] is not None:
+            raise KeyError(f"documento já existe: {self.path}")
+        self._store.write(self.path, data, merge=False)
+
+    def delete(self, **_kw) -> None:
+        _block()
+        self._store.delete(self.path)
+
+
+class FakeCollectionReference:
+    def __init__(self, store: "FakeStore", path: str):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self._store, f"{self.path}/{doc_id}")
+
+    def order_by(self, *_a, **_kw) -> "FakeQuery":
+        return FakeQuery(self)
+
+    def where(self, *, filter) -> "FakeQuery":
+        return FakeQuery(self).where(filter=filter)
+
+    def limit(self, n: int) -> "FakeQuery":
+        return FakeQuery(self).limit(n)
+
+    def stream(self, **_kw):
+        return FakeQuery(self).stream()
+
+
+def _filter_matches(field_filter, data: dict) -> bool:
+    value = data.get(field_filter.field_path)
+    op = field_filter.op_string
+    if op == "==":
+        return value == field_filter.value
+    if op == "array_contains":
+        return isinstance(value, list) and field_filter.value in value
+    if op == "array_contains_any":
+        return isinstance(value, list) and any(v in value for v in field_filter.value)
+    raise NotImplementedError(f"operador não suportado no stand-in: {op}")
+
+
+class FakeQuery:
+    """Só o que o app usa: ordem por ID do doc, `start_after`, `limit` e
+    `where(filter=FieldFilter(...))` com `==`/`array_contains`/`array_contains_any`."""
+
+    def __init__(self, collection: FakeCollectionReference):
+        self._collection = collection
+        self._limit: int | None = None
+        self._start_after: str | None = None
+        self._filters: list = []
+
+    def order_by(self, *_a, **_kw) -> "FakeQuery":
+        return self
+
+    def where(self, *, filter) -> "FakeQuery":
+        self._filters.append(filter)
+        return self
+
+    def limit(self, n: int) -> "FakeQuery":
+        self._limit = n
+        return self
+
+    def start_after(self, cursor) -> "FakeQuery":
+        self._start_after = str(next(iter(cursor.values())) if isinstance(cursor, dict) else cursor.id)
+        return self
+
+    def stream(self, **_kw):
+        _block()
+        docs = self._collection._store.children(self._collection.path)
+        if self._filters:
+            docs = [(doc_id, d, t) for doc_id, d, t in docs if all(_filter_matches(f, d) for f in self._filters)]
+        if self._start_after is not None:
+            docs = [(doc_id, d, t) for doc_id, d, t in docs if doc_id > self._start_after]
+        if self._limit is not None:
+            docs = docs[: self._limit]
+        for doc_id, data, update_time in docs:
+            yield FakeSnapshot(self._collection.document(doc_id), data, update_time)
+
+
+class FakeWriteBatch:
+    def __init__(self):
+        self._ops: list = []
+
+    def set(self, ref: FakeDocumentReference, data: dict, merge: bool = False) -> None:
+        self._ops.append(lambda: ref._store.write(ref.path, data, merge=merge))
+
+    def update(self, ref: FakeDocumentReference, data: dict) -> None:
+        self._ops.append(lambda: ref._store.write(ref.path, data, merge=True))
+
+    def delete(self, ref: FakeDocumentReference) -> None:
+        self._ops.append(lambda: ref._store.delete(ref.path))
+
+    def commit(self, **_kw) -> None:
+        _block()
+        for op in self._ops:
+            op()
+        self._ops = []
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Escritas aplicadas no commit; leituras vão direto ao store (sem isolamento)."""
+
+
+def _transactional(fn):
+    def wrapper(transaction: FakeTransaction, *args, **kwargs):
+        result = fn(transaction, *args, **kwargs)
+        transaction.commit()
+        return result
+
+    return wrapper
+
+
+class FakeStore:
+    """Documentos em memória do processo, indexados pelo path completo."""
+
+    def __init__(self):
+        self._docs: dict[str, tuple[dict, _dt.datetime]] = {}
+        self._lock = threading.Lock()
+
+    def read(self, path: str):
+        with self._lock:
+            entry = self._docs.get(path)
+        if entry is None:
+            return None, None
+        return dict(entry[0]), entry[1]
+
+    def write(self, path: str, data: dict, *, merge: bool) -> None:
+        now = _dt.datetime.now(_dt.timezone.utc)
+        with self._lock:
+            current = dict(self._docs[path][0]) if merge and path in self._docs else {}
+            for key, value in data.items():
+                resolved = _resolve_transform(value, current.get(key), now)
+                if resolved is _DELETE:
+                    current.pop(key, None)
+                else:
+                    current[key] = resolved
+            self._docs[path] = (current, now)
+
+    def delete(self, path: str) -> None:
+        with self._lock:
+            self._docs.pop(path, None)
+
+    def children(self, collection_path: str) -> list:
+        prefix = collection_path + "/"
+        with self._lock:
+            items = [
+                (path[len(prefix):], dict(data), update_time)
+                for path, (data, update_time) in self._docs.items()
+                if path.startswith(prefix) and "/" not in path[len(prefix):]
+            ]
+        return sorted(items, key=lambda item: item[0])
+
+
+_DELETE = object()
+
+
+def _resolve_transform(value, current, now):
+    if value is firestore.SERVER_TIMESTAMP:
+        return now
+    if value is firestore.DELETE_FIELD:
+        return _DELETE
+    if isinstance(value, firestore.ArrayUnion):
+        merged = list(current or [])
+        merged.extend(v for v in value.values if v not in merged)
+        return merged
+    if isinstance(value, firestore.ArrayRemove):
+        return [v for v in (current or []) if v not in value.values]
+    if isinstance(value, firestore.Increment):
+        return (current or 0) + value.value
+    return value
+
+
+_store = FakeStore()
+
+
+class FakeFirestoreClient:
+    def __init__(self, *_a, **_kw):
+        instances["firestore"] += 1
+        live["firestore"].add(self)
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(_store, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch()
+
+    def transaction(self) -> FakeTransaction:
+        return FakeTransaction()
+
+
+# --------------------------------------------------------------------------- #
+# Secret Manager                                                              #
+# --------------------------------------------------------------------------- #
+
+
+class _Payload:
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+class _SecretVersion:
+    def __init__(self, name: str, data: bytes):
+        self.name = name
+        self.payload = _Payload(data)
+
+
+_secrets: dict[str, list[bytes]] = {
+    "proof-social-instagram-app-id": [b"offline-app-id"],
+    "proof-social-instagram-app-secret": [b"offline-app-secret"],
+}
+_secrets_lock = threading.Lock()
+_version_states: dict[str, str] = {}  # nome da versão → DISABLED | DESTROYED (ausente = ENABLED)
+
+
+class FakeSecretManagerClient:
+    def __init__(self, *_a, **_kw):
+        instances["secretmanager"] += 1
+        live["secretmanager"].add(self)
+
+    @staticmethod
+    def _secret_id(name: str) -> str:
+        return name.split("/secrets/", 1)[1].split("/", 1)[0]
+
+    def access_secret_version(self, request: dict, **_kw) -> _SecretVersion:
+        _block()
+        secret_id = self._secret_id(request["name"])
+        with _secrets_lock:
+            versions = _secrets.get(secret_id)
+            if not versions:
+                raise KeyError(request["name"])
+            return _SecretVersion(request["name"], versions[-1])
+
+    def get_secret(self, request: dict, **_kw) -> dict:
+        _block()
+        if self._secret_id(request["name"]) not in _secrets:
+            raise KeyError(request["name"])
+        return {"name": request["name"]}
+
+    def create_secret(self, request: dict, **_kw) -> dict:
+        _block()
+        with _secrets_lock:
+            _secrets.setdefault(request["secret_id"], [])
+        return {"name": f"{request['parent']}/secrets/{request['secret_id']}"}
+
+    def add_secret_version(self, request: dict, **_kw) -> dict:
+        _block()
+        secret_id = self._secret_id(request["parent"] + "/")
+        with _secrets_lock:
+            _secrets.setdefault(secret_id, []).append(request["payload"]["data"])
+            version = len(_secrets[secret_id])
+        return {"name": f"{request['parent']}/versions/{version}"}
+
+    def list_secret_versions(self, request: dict, **_kw) -> list[_SecretVersion]:
+        _block()
+        secret_id = self._secret_id(request["parent"] + "/")
+        want_enabled = request.get("filter") == "state:ENABLED"
+        with _secrets_lock:
+            names = [f"{request['parent']}/versions/{i + 1}" for i in range(len(_secrets.get(secret_id) or []))]
+        if want_enabled:
+            names = [n for n in names if n not in _version_states]
+        else:
+            names = [n for n in names if _version_states.get(n) != "DESTROYED"]
+        return [_SecretVersion(name, b"") for name in names]
+
+    def disable_secret_version(self, request: dict, **_kw) -> None:
+        _block()
+        _version_states[request["name"]] = "DISABLED"
+
+    def destroy_secret_version(self, request: dict, **_kw) -> None:
+        _block()
+        _version_states[request["name"]] = "DESTROYED"
+
+
+# --------------------------------------------------------------------------- #
+# Meta (graph.instagram.com / api.instagram.com)                              #
+# --------------------------------------------------------------------------- #
+
+
+def _ig_id_for(code: str) -> str:
+    return str(int(hashlib.sha256(code.encode()).hexdigest()[:12], 16))
+
+
+_personal_ids: set[str] = set()
+
+
+async def _meta_handler(request: httpx.Request) -> httpx.Response:
+    if META_LATENCY_S:
+        await asyncio.sleep(META_LATENCY_S)
+    path = request.url.path
+    if request.url.host == "api.instagram.com" and path == "/oauth/access_token":
+        form = parse_qs(request.content.decode())
+        code = form.get("code", [""])[0]
+        # `acct:<id>:<nonce>` fixa a conta; `personal:<id>:<nonce>` idem, conta
+        # não Profissional; senão a conta é derivada do code.
+        ig_id = code.split(":")[1] if code.startswith(("acct:", "personal:")) else _ig_id_for(code)
+        if code.startswith("personal:"):
+            _personal_ids.add(ig_id)
+        return httpx.Response(200, json={
+            "access_token": f"short-{ig_id}",
+            "user_id": ig_id,
+            "permissions": ["instagram_business_basic"],
+        })
+    token = request.url.params.get("access_token", "")
+    ig_id = token.split("-", 1)[-1]
+    if ig_id in _personal_ids:
+        # Assinatura da Meta para token de conta inelegível em graph.instagram.com.
+        return httpx.Response(400, json={"error": {
+            "message": "Unsupported request - method type: get", "type": "IGApiException", "code": 100,
+        }})
+    if path == "/access_token":
+        return httpx.Response(200, json={
+            "access_token": f"long-{ig_id}",
+            "token_type": "bearer",
+            "expires_in": 5183944,
+        })
+    if path.endswith("/me"):
+        return httpx.Response(200, json={
+            "id": ig_id,
+            "username": f"conta_{ig_id}",
+            "name": f"Conta {ig_id}",
+            "account_type": "BUSINESS",
+            "followers_count": 1000,
+            "media_count": 42,
+            "profile_picture_url": "",
+        })
+    return httpx.Response(404, json={"error": {"message": "not found", "code": 803}})
+
+
+_RealAsyncClient = httpx.AsyncClient
+
+
+class _MetaStandInClient(_RealAsyncClient):
+    def __init__(self, *args, **kwargs):
+        instances["httpx"] += 1
+        live["httpx"].add(self)
+        kwargs.setdefault("transport", httpx.MockTransport(_meta_handler))
+        super().__init__(*args, **kwargs)
+
+
+def prune_data(prefixes: tuple[str, ...] = ("oauth_callback_jobs/", "connection_events/"),
+               min_age_s: float = 30.0) -> None:
+    """Descarta dados que no ambiente real saem do processo (TTL/analytics) e
+    os secrets — senão o "banco" em memória cresce e o soak acusa vazamento.
+    Docs escritos há menos de `min_age_s` ficam (job ainda em long-poll)."""
+    cutoff = _dt.datetime.now(_dt.timezone.utc) - _dt.timedelta(seconds=min_age_s)
+    with _store._lock:
+        for path in [p for p, (_, updated) in _store._docs.items() if p.startswith(prefixes) and updated < cutoff]:
+            del _store._docs[path]
+    with _secrets_lock:
+        for secret_id in [k for k in _secrets if not k.startswith("proof-social-")]:
+            del _secrets[secret_id]
+
+
+def data_size() -> dict:
+    return {"docs": len(_store._docs), "secrets": len(_secrets)}
+
+
+def _verify_id_token(token: str, *_a, **_kw) -> dict:
+    return {"uid": token}
+
+
+def install() -> None:
+    """Substitui os clientes reais pelos stand-ins. Chamar antes de importar `main`."""
+    firestore.Client = FakeFirestoreClient
+    firestore.transactional = _transactional
+    secretmanager.SecretManagerServiceClient = FakeSecretManagerClient
+    firebase_admin.auth.verify_id_token = _verify_id_token
+    httpx.AsyncClient = _MetaStandInClient
+
+
+install()
+
+from main import app  # noqa: E402,F401
@@ -0,0 +1,297 @@
+"""Refresh em lote das métricas de perfil das contas conectadas.
+
+`followers_count`, `media_count`, `profile_picture_url` e `username` só eram
+copiados do `/me` na conexão. Este job (Cloud Run Job / Scheduler):
+
+- varre `integrations` ativas por cursor e, por página, junta as contas
+  ativas cujo `profile_refreshed_at` é mais velho que `--min-age-hours`;
+- chama `/me` com concorrência limitada (`--concurrency`) e pacing por app
+  (`--app-rps`, token bucket). Se `X-App-Usage` passa de `--usage-threshold`%,
+  pausa todos os workers por `--usage-cooldown` s; conta com
+  `X-Business-Use-Case-Usage` indicando bloqueio é pulada nesta rodada;
+- grava as mudanças via BulkWriter, com flush e checkpoint por página.
+  Docs layout array são reescritos uma vez por integração, com precondição
+  `last_update_time` (conexão concorrente → pulado, pega na próxima rodada).
+  No layout subcollection a raiz é tocada depois do flush das contas (o cache
+  de GET /auth/instagram/accounts valida pelo update_time da raiz).
+
+    python -m scripts.refresh_profiles --concurrency 50 --app-rps 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as _dt
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from google.cloud import firestore
+from google.cloud.firestore_v1.bulk_writer import BulkWriterOptions
+
+from core.accounts_store import LAYOUT_SUBCOLLECTION, accounts_collection, layout_of, touch_roots
+from core.firestore_scan import DEFAULT_PAGE_SIZE, Checkpoint, iter_pages
+from core.logging_config import setup_logging
+from core.rate_limit import LocalTokenBucket, RateLimitRule
+from core.security import get_secret_manager_client, read_access_token
+from routes.auth import INSTAGRAM_GRAPH_ME_URL
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ("username", "followers_count", "media_count", "profile_picture_url")
+
+
+@dataclass
+class AccountTask:
+    integration_id: str
+    account: dict
+    account_ref: Optional[object]  # None no layout array
+
+
+@dataclass
+class RefreshConfig:
+    concurrency: int = 50
+    app_rps: float = 100.0
+    min_age: _dt.timedelta = _dt.timedelta(hours=12)
+    usage_threshold: float = 85.0
+    usage_cooldown_s: float = 60.0
+
+
+class MetaUsageGate:
+    """Pausa global quando o header X-App-Usage indica perto do limite do app."""
+
+    def __init__(self, threshold: float, cooldown_s: float):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self._paused_until = 0.0
+
+    async def wait(self) -> None:
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, headers: httpx.Headers) -> None:
+        usage = _parse_usage_header(headers.get("x-app-usage"))
+        peak = max((float(v) for v in usage.values() if isinstance(v, (int, float))), default=0.0)
+        if peak >= self.threshold:
+            self._paused_until = max(self._paused_until, time.monotonic() + self.cooldown_s)
+            logger.warning("X-App-Usage em %.0f%% — pausando refresh por %.0fs", peak, self.cooldown_s)
+
+
+def _parse_usage_header(raw: Optional[str]) -> dict:
+    if not raw:
+        return {}
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _token_blocked(headers: httpx.Headers) -> bool:
+    """X-Business-Use-Case-Usage com tempo de recuperação > 0 = conta limitada."""
+    usage = _parse_usage_header(headers.get("x-business-use-case-usage"))
+    for entries in usage.values():
+        for entry in entries if isinstance(entries, list) else []:
+            if int((entry or {}).get("estimated_time_to_regain_access") or 0) > 0:
+                return True
+    return False
+
+
+def _is_stale(account: dict, cutoff: _dt.datetime) -> bool:
+    refreshed_at = account.get("profile_refreshed_at")
+    return not isinstance(refreshed_at, _dt.datetime) or refreshed_at < cutoff
+
+
+class ProfileRefresher:
+    def __init__(self, db, config: RefreshConfig, *, dry_run: bool = False):
+        self.db = db
+        self.config = config
+        self.dry_run = dry_run
+        self.gate = MetaUsageGate(config.usage_threshold, config.usage_cooldown_s)
+        self.bucket = LocalTokenBucket()
+        self.app_rule = RateLimitRule(capacity=max(1.0, config.app_rps), refill_per_second=config.app_rps)
+        self.secrets = get_secret_manager_client()
+        # Leitura do Secret Manager é bloqueante: pool próprio do tamanho da concorrência.
+        self.executor = ThreadPoolExecutor(max_workers=config.concurrency)
+        self.semaphore = asyncio.Semaphore(config.concurrency)
+
+    def collect(self, page: list, cutoff: _dt.datetime) -> tuple[list[AccountTask], dict]:
+        """Contas a atualizar numa página de integrações + snapshots dos docs array."""
+        tasks: list[AccountTask] = []
+        array_docs: dict = {}
+        for snap in page:
+            data = snap.to_dict() or {}
+            if layout_of(data) == LAYOUT_SUBCOLLECTION:
+                for account_snap in accounts_collection(snap.reference).stream():
+                    account = account_snap.to_dict() or {}
+                    if account.get("active", True) and account.get("api_key") and _is_stale(account, cutoff):
+                        tasks.append(AccountTask(snap.id, account, account_snap.reference))
+            else:
+                accounts = data.get("instagram_accounts") or []
+                stale = [
+                    a for a in accounts
+                    if a.get("active", True) and a.get("api_key") and _is_stale(a, cutoff)
+                ]
+                if stale:
+                    array_docs[snap.id] = snap
+                    tasks.extend(AccountTask(snap.id, a, None) for a in stale)
+        return tasks, array_docs
+
+    async def fetch(self, client: httpx.AsyncClient, task: AccountTask) -> Optional[dict]:
+        """Busca o perfil de uma conta. None = pular (erro/limite), logado."""
+        async with self.semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                token = await loop.run_in_executor(
+                    self.executor, read_access_token, task.account["api_key"], self.secrets,
+                )
+            except Exception as e:
+                logger.warning("Secret ilegível conta=%s: %s", task.account.get("id"), e)
+                return None
+
+            await self.gate.wait()
+            await self.bucket.acquire("app", self.app_rule)
+            try:
+                resp = await client.get(
+                    INSTAGRAM_GRAPH_ME_URL,
+                    params={"fields": ",".join(("id",) + PROFILE_FIELDS), "access_token": token},
+                )
+            except httpx.RequestError as e:
+                logger.warning("/me transporte falhou conta=%s: %s", task.account.get("id"), e)
+                return None
+
+            self.gate.observe(resp.headers)
+            if _token_blocked(resp.headers):
+                logger.warning("Conta %s limitada pela Meta; pulando", task.account.get("id"))
+                return None
+            if resp.status_code != 200:
+                logger.warning(
+                    "/me retornou %d conta=%s: %s", resp.status_code, task.account.get("id"),
+                    resp.text[:300],
+                    extra={"event": "profile_refresh.meta_error", "meta_status": resp.status_code},
+                )
+                return None
+            return resp.json()
+
+    def write(
+        self, bulk_writer, tasks: list[AccountTask], results: list, array_docs: dict,
+    ) -> tuple[int, list]:
+        """Enfileira as escritas da página. Retorna (escritas, raízes com subdoc
+        alterado — a tocar depois do flush, vide accounts_store.touch_roots)."""
+        now = _dt.datetime.now(_dt.timezone.utc)
+        updates_by_doc: dict[str, dict[str, dict]] = {}
+        touched: dict[str, object] = {}
+        writes = 0
+        for task, profile in zip(tasks, results):
+            if not isinstance(profile, dict):
+                continue
+            fields = {k: profile[k] for k in PROFILE_FIELDS if k in profile}
+            fields["profile_refreshed_at"] = now
+            if task.account_ref is not None:
+                writes += 1
+                if not self.dry_run:
+                    bulk_writer.update(task.account_ref, fields)
+                    touched[task.integration_id] = (
+                        self.db.collection("integrations").document(task.integration_id)
+                    )
+            else:
+                updates_by_doc.setdefault(task.integration_id, {})[str(task.account.get("id"))] = fields
+
+        for integration_id, per_account in updates_by_doc.items():
+            snap = array_docs[integration_id]
+            accounts = [
+                {**a, **per_account.get(str(a.get("id")), {})}
+                for a in ((snap.to_dict() or {}).get("instagram_accounts") or [])
+            ]
+            writes += 1
+            if not self.dry_run:
+                bulk_writer.update(
+                    snap.reference,
+                    {"instagram_accounts": accounts},
+                    option=self.db.write_option(last_update_time=snap.update_time),
+                )
+        return writes, list(touched.values())
+
+    async def run(self, *, page_size: int, checkpoint: Checkpoint) -> dict:
+        cutoff = _dt.datetime.now(_dt.timezone.utc) - self.config.min_age
+        query = self.db.collection("integrations").where(
+            filter=firestore.FieldFilter("status", "==", "active")
+        )
+        bulk_writer = self.db.bulk_writer(options=BulkWriterOptions(max_ops_per_second=500))
+        bulk_writer.on_write_error(lambda failure, _bw: failure.code != 9 and failure.attempts < 5)
+        limits = httpx.Limits(
+            max_connections=self.config.concurrency,
+            max_keepalive_connections=self.config.concurrency,
+        )
+        loop = asyncio.get_running_loop()
+        pages = iter_pages(query, page_size=page_size, start_after=checkpoint.last_doc_id)
+        try:
+            async with httpx.AsyncClient(timeout=15.0, limits=limits) as client:
+                while True:
+                    # Leitura da página (bloqueante) fora do event loop.
+                    page = await loop.run_in_executor(self.executor, next, pages, None)
+                    if page is None:
+                        break
+                    tasks, array_docs = await loop.run_in_executor(
+                        self.executor, self.collect, page, cutoff,
+                    )
+                    checkpoint.incr("integrations", len(page))
+                    checkpoint.incr("accounts_due", len(tasks))
+                    results = await asyncio.gather(
+                        *(self.fetch(client, t) for t in tasks), return_exceptions=True,
+                    )
+                    refreshed = sum(1 for r in results if isinstance(r, dict))
+                    checkpoint.incr("refreshed", refreshed)
+                    checkpoint.incr("skipped", len(tasks) - refreshed)
+                    writes, touched = self.write(bulk_writer, tasks, results, array_docs)
+                    await loop.run_in_executor(self.executor, bulk_writer.flush)
+                    if touched:
+                        writes += touch_roots(bulk_writer, touched)
+                        await loop.run_in_executor(self.executor, bulk_writer.flush)
+                    checkpoint.incr("writes", writes)
+                    if not self.dry_run:
+                        checkpoint.save(page[-1].id)
+                    logger.info("Página até %s: %s", page[-1].id, checkpoint.counters)
+        finally:
+            bulk_writer.close()
+            self.executor.shutdown(wait=False)
+        return checkpoint.counters
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--app-rps", type=float, default=100.0, help="Teto de chamadas/s à Meta (app inteiro)")
+    parser.add_argument("--min-age-hours", type=float, default=12.0, help="Pula contas atualizadas há menos que isso")
+    parser.add_argument("--usage-threshold", type=float, default=85.0, help="%% do X-App-Usage que dispara pausa")
+    parser.add_argument("--usage-cooldown", type=float, default=60.0)
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument("--checkpoint", help="Arquivo JSON de checkpoint (retomada)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.app_rps <= 0:
+        parser.error("--app-rps deve ser > 0")
+
+    setup_logging()
+    config = RefreshConfig(
+        concurrency=args.concurrency,
+        app_rps=args.app_rps,
+        min_age=_dt.timedelta(hours=args.min_age_hours),
+        usage_threshold=args.usage_threshold,
+        usage_cooldown_s=args.usage_cooldown,
+    )
+    refresher = ProfileRefresher(firestore.Client(), config, dry_run=args.dry_run)
+    counters = asyncio.run(
+        refresher.run(page_size=args.page_size, checkpoint=Checkpoint(args.checkpoint))
+    )
+    logger.info("Refresh concluído: %s", counters)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Soak: roda o app por horas contra os stand-ins offline e acusa vazamentos.
+
+Estruturas/recursos que podem crescer entre requests: `processing_codes`,
+`httpx.AsyncClient` / `firestore.Client()` / `SecretManagerServiceClient` por
+request (cada cliente real segura pool de conexões ou canal gRPC), tasks de
+fundo, buffer de eventos. Este script, no mesmo processo do app
+(`scripts.offline_app`, via ASGITransport — sem rede):
+
+- gera carga mista: fluxo síncrono, modo async + polling do job, e code
+  duplicado em paralelo (exercita `processing_codes`);
+- a cada `--sample-every` s mede RSS, FDs abertos, threads, tasks asyncio,
+  clientes vivos por tipo (proxy dos canais gRPC), tamanhos das estruturas
+  internas e o atraso do event loop (ticker de 50ms);
+- no fim, para a carga, espera esvaziar e compara a mediana das primeiras
+  amostras pós-aquecimento com a das últimas. Crescimento além das
+  tolerâncias (ou estrutura que não volta a zero ociosa) → exit code 1.
+
+    python -m scripts.soak --duration 7200 --concurrency 32
+    python -m scripts.soak --duration 120 --sample-every 5     # fumaça
+
+Uma linha JSON por amostra no stdout; resumo e veredito no final.
+Linux (lê /proc/self).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs, urlparse
+
+os.environ.setdefault("OFFLINE_BLOCKING_MS", "2")
+os.environ.setdefault("OFFLINE_META_LATENCY_MS", "20")
+
+from scripts import offline_app  # noqa: E402  (instala os stand-ins e importa main)
+from scripts.load_harness import Stats, run_flow  # noqa: E402
+
+import httpx  # noqa: E402
+
+from core.callback_jobs import callback_jobs  # noqa: E402
+from core.concurrency import meta_limiter  # noqa: E402
+from core.events import event_log  # noqa: E402
+from routes.auth import processing_codes  # noqa: E402
+
+REDIRECT_URI = "https://app.proof.social/auth/instagram/callback"
+
+# Devem voltar a zero com o app ocioso.
+_IDLE_ZERO = ("processing_codes", "callback_jobs", "meta_in_flight", "meta_queued", "event_buffer")
+
+
+def _proc_status() -> dict:
+    values = {}
+    with open("/proc/self/status", encoding="utf-8") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "Threads"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+class LagMonitor:
+    """Atraso do event loop: ticker de `interval_s`; mede quanto cada tick atrasou."""
+
+    def __init__(self, interval_s: float = 0.05):
+        self.interval_s = interval_s
+        self._window: list[float] = []
+        self.all: list[float] = []
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval_s
+            await asyncio.sleep(self.interval_s)
+            lag = max(0.0, loop.time() - expected)
+            self._window.append(lag)
+            self.all.append(lag)
+
+    def take_window(self) -> list[float]:
+        window, self._window = self._window, []
+        return window
+
+
+def _pct(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def sample(lag: LagMonitor, stats: Stats, started: float) -> dict:
+    status = _proc_status()
+    window = lag.take_window()
+    return {
+        "t_s": round(time.monotonic() - started, 1),
+        "rss_mb": round(status.get("VmRSS", 0) / 1024, 1),
+        "fds": len(os.listdir("/proc/self/fd")),
+        "threads": status.get("Threads", threading.active_count()),
+        "tasks": len(asyncio.all_tasks()),
+        "live_httpx": len(offline_app.live["httpx"]),
+        "live_firestore": len(offline_app.live["firestore"]),
+        "live_secretmanager": len(offline_app.live["secretmanager"]),
+        "processing_codes": len(processing_codes),
+        "callback_jobs": len(callback_jobs),
+        "meta_in_flight": meta_limiter.in_flight,
+        "meta_queued": meta_limiter.queued,
+        "event_buffer": len(event_log),
+        **offline_app.data_size(),
+        "flows": stats.flows,
+        "errors": sum(stats.errors.values()),
+        "lag_p99_ms": round(_pct(window, 99) * 1000, 1),
+        "lag_max_ms": round(max(window, default=0.0) * 1000, 1),
+    }
+
+
+async def _login(client: httpx.AsyncClient, headers: dict) -> str:
+    resp = await client.post("/auth/instagram/login", json={"redirect_uri": REDIRECT_URI}, headers=headers)
+    resp.raise_for_status()
+    return parse_qs(urlparse(resp.json()["auth_url"]).query)["state"][0]
+
+
+async def async_flow(client: httpx.AsyncClient, user_uid: str, stats: Stats) -> None:
+    """Callback em modo async + long-poll do job."""
+    headers = {"Authorization": f"Bearer {user_uid}"}
+    state = await _login(client, headers)
+    code = f"acct:{random.randrange(10**6)}:{uuid.uuid4().hex}"
+    resp = await client.post(
+        "/auth/instagram/process-callback",
+        json={"code": code, "state": state, "redirect_uri": REDIRECT_URI, "async_mode": True},
+        headers=headers,
+    )
+    if resp.status_code != 202:
+        stats.error(f"async:{resp.status_code}")
+        return
+    status_url = resp.json()["status_url"]
+    for _ in range(10):
+        resp = await client.get(status_url, params={"wait": 5}, headers=headers)
+        if resp.status_code != 202:
+            break
+    if resp.status_code == 200:
+        stats.flows += 1
+    else:
+        stats.error(f"async_job:{resp.status_code}")
+
+
+async def duplicate_code_flow(client: httpx.AsyncClient, user_uid: str, stats: Stats) -> None:
+    """Mesmo code/state em paralelo (duplo clique): disputa o lock de processing_codes."""
+    headers = {"Authorization": f"Bearer {user_uid}"}
+    state = await _login(client, headers)
+    body = {"code": f"acct:{random.randrange(10**6)}:{uuid.uuid4().hex}", "state": state, "redirect_uri": REDIRECT_URI}
+    responses = await asyncio.gather(*(
+        client.post("/auth/instagram/process-callback", json=body, headers=headers) for _ in range(2)
+    ))
+    if all(r.status_code == 200 for r in responses):
+        stats.flows += 1
+    else:
+        stats.error("duplicate:" + ",".join(str(r.status_code) for r in responses))
+
+
+async def worker(client: httpx.AsyncClient, stop: asyncio.Event, stats: Stats, users: int) -> None:
+    while not stop.is_set():
+        user_uid = f"soak-user-{random.randrange(users)}"
+        roll = random.random()
+        try:
+            if roll < 0.1:
+                await async_flow(client, user_uid, stats)
+            elif roll < 0.2:
+                await duplicate_code_flow(client, user_uid, stats)
+            else:
+                await run_flow(client, user_uid, 3, stats)
+        except httpx.HTTPError as e:
+            stats.error(type(e).__name__)
+
+
+def evaluate(samples: list[dict], idle: dict, args: argparse.Namespace, lag_all: list[float]) -> list[str]:
+    failures = []
+    warm = [s for s in samples if s["t_s"] >= args.warmup]
+    if len(warm) < 2 * args.window:
+        return [f"amostras insuficientes após aquecimento ({len(warm)}); aumente --duration"]
+    head, tail = warm[:args.window], warm[-args.window:]
+
+    def growth(key: str) -> float:
+        return statistics.median(s[key] for s in tail) - statistics.median(s[key] for s in head)
+
+    tolerances = {
+        "rss_mb": args.rss_tolerance_mb,
+        "fds": args.fd_tolerance,
+        "threads": args.thread_tolerance,
+        "tasks": args.task_tolerance,
+        "live_httpx": args.client_tolerance,
+        "live_firestore": args.client_tolerance,
+        "live_secretmanager": args.client_tolerance,
+    }
+    for key, tolerance in tolerances.items():
+        delta = growth(key)
+        if delta > tolerance:
+            failures.append(f"{key} cresceu {delta:.1f} (tolerância {tolerance})")
+    for key in _IDLE_ZERO:
+        if idle[key]:
+            failures.append(f"{key}={idle[key]} com o app ocioso (esperado 0)")
+    for key in ("live_httpx", "live_firestore", "live_secretmanager"):
+        if idle[key] > args.client_tolerance:
+            failures.append(f"{key}={idle[key]} clientes vivos com o app ocioso")
+    lag_p99 = _pct(lag_all, 99) * 1000
+    if lag_p99 > args.max_lag_ms:
+        failures.append(f"lag p99 do event loop {lag_p99:.0f}ms (máx {args.max_lag_ms}ms)")
+    return failures
+
+
+async def soak(args: argparse.Namespace) -> int:
+    app = offline_app.app
+    await app.router.startup()
+    stats = Stats()
+    lag = LagMonitor()
+    stop = asyncio.Event()
+    samples: list[dict] = []
+    started = time.monotonic()
+    lag_task = asyncio.create_task(lag.run())
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://soak", timeout=60.0, limits=limits,
+    ) as client:
+        workers = [asyncio.create_task(worker(client, stop, stats, args.users)) for _ in range(args.concurrency)]
+        try:
+            while time.monotonic() - started < args.duration:
+                await asyncio.sleep(args.sample_every)
+                offline_app.prune_data()
+                samples.append(sample(lag, stats, started))
+                print(json.dumps(samples[-1]), flush=True)
+        finally:
+            stop.set()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    # Ociosidade: jobs de fundo terminam, eventos descarregam, clientes são coletados.
+    await callback_jobs.drain(timeout_s=30)
+    await event_log.flush()
+    await asyncio.sleep(1.0)
+    gc.collect()
+    idle = sample(lag, stats, started)
+    lag_task.cancel()
+    await app.router.shutdown()
+
+    failures = evaluate(samples, idle, args, lag.all)
+    print(json.dumps({
+        "idle": idle,
+        "flows": stats.flows,
+        "errors": stats.errors,
+        "lag_p99_ms": round(_pct(lag.all, 99) * 1000, 1),
+        "verdict": "FAIL" if failures else "OK",
+        "failures": failures,
+    }, ensure_ascii=False, indent=2))
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=3600.0, help="Segundos de carga")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--sample-every", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=120.0, help="Segundos ignorados na comparação")
+    parser.add_argument("--window", type=int, default=5, help="Amostras na mediana de início/fim")
+    parser.add_argument("--rss-tolerance-mb", type=float, default=50.0)
+    parser.add_argument("--fd-tolerance", type=float, default=16)
+    parser.add_argument("--thread-tolerance", type=float, default=4)
+    parser.add_argument("--task-tolerance", type=float, default=50)
+    parser.add_argument("--client-tolerance", type=float, help="Clientes vivos a mais (default 2×--concurrency)")
+    parser.add_argument("--max-lag-ms", type=float, default=250.0, help="p99 máximo do atraso do event loop")
+    args = parser.parse_args()
+    if args.client_tolerance is None:
+        args.client_tolerance = 2 * args.concurrency
+    sys.exit(asyncio.run(soak(args)))
+
+
+if __name__ == "__main__":
+    main()